@@ -22,9 +22,10 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import shutil
 import subprocess
 from pathlib import Path
-from typing import Self
+from typing import Optional, Self, Tuple
 
 from pydantic import BaseModel
 
@@ -49,6 +50,92 @@ class CfmidManager(BaseModel):
     prune_probability: float
     niceness: int
 
+    @staticmethod
+    def write_chunk(
+        prepped_cfmid_file: Path, chunk_file: Path, chunk: int, n_chunks: int
+    ) -> Path:
+        """Writes every n_chunks-th line of the CFM-ID input file to a chunk file
+
+        Arguments:
+            prepped_cfmid_file: Path of input file containing metabolite name, SMILES.
+            chunk_file: Path of the chunk file to write.
+            chunk: Zero-based index of the chunk.
+            n_chunks: Total number of chunks.
+
+        Returns:
+            chunk_file: Path of the written chunk file.
+
+        Raise:
+            ValueError: chunk is not within the range of n_chunks.
+        """
+        if n_chunks < 1 or not 0 <= chunk < n_chunks:
+            raise ValueError(
+                f"Chunk index '{chunk}' is out of range for '{n_chunks}' chunks."
+            )
+        with open(prepped_cfmid_file) as infile, open(chunk_file, "w") as outfile:
+            for linenr, line in enumerate(infile):
+                if linenr % n_chunks == chunk:
+                    outfile.write(line)
+        return chunk_file
+
+    @staticmethod
+    def predicted_smiles(log_file: Path) -> Optional[str]:
+        """Reads the SMILES from the header of a CFM-ID prediction
+
+        Arguments:
+            log_file: Path of a CFM-ID .log file.
+
+        Returns:
+            The SMILES of the #SMILES= header line or None if there is none.
+        """
+        with open(log_file) as infile:
+            for line in infile:
+                if not line.startswith("#"):
+                    break
+                if line.startswith("#SMILES="):
+                    return line[len("#SMILES=") :].strip()
+        return None
+
+    def write_pending(
+        self: Self, pending_file: Path, reuse_folder: Optional[Path] = None
+    ) -> Tuple[int, int]:
+        """Reuses existing predictions and writes the metabolites still to predict
+
+        A prediction is only reused if its SMILES matches the SMILES of the
+        metabolite. Matching predictions found in reuse_folder are copied to
+        cfm_id_folder; outdated predictions in cfm_id_folder are removed and the
+        metabolite is written to the pending file.
+
+        Arguments:
+            pending_file: Path of the CFM-ID input file with the remaining metabolites.
+            reuse_folder: Optional folder with .log files of a previous build.
+
+        Returns:
+            Tuple of the number of reused and the number of pending metabolites.
+        """
+        self.cfm_id_folder.mkdir(parents=True, exist_ok=True)
+        n_reused = 0
+        n_pending = 0
+        with (
+            open(self.prepped_cfmid_file) as infile,
+            open(pending_file, "w") as outfile,
+        ):
+            for line in infile:
+                name, _, smiles = line.strip().partition(" ")
+                target = self.cfm_id_folder.joinpath(f"{name}.log")
+                if target.exists() and self.predicted_smiles(target) != smiles:
+                    target.unlink()
+                if not target.exists() and reuse_folder is not None:
+                    source = Path(reuse_folder).joinpath(f"{name}.log")
+                    if source.exists() and self.predicted_smiles(source) == smiles:
+                        shutil.copyfile(source, target)
+                if target.exists():
+                    n_reused += 1
+                else:
+                    outfile.write(line)
+                    n_pending += 1
+        return n_reused, n_pending
+
     def run_program(self: Self, logger):
         """Builds and executes the command to run CFM-ID in dockerized environment
         using nice -16
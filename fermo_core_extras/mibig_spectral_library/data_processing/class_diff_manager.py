@@ -0,0 +1,212 @@
+"""Compares two .mgf spectral libraries and applies delta releases.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_query_manager import (
+    QueryManager,
+)
+
+
+class DiffManager:
+    """Manages the comparison of library builds and the application of deltas.
+
+    Spectra are identified by their ID field. A delta consists of the files
+    added.mgf, removed.mgf and changed.mgf, the latter holding the new version of
+    each changed spectrum. Only depends on the standard library.
+    """
+
+    DELTA_FILES = ("added.mgf", "removed.mgf", "changed.mgf")
+
+    @staticmethod
+    def spectrum_digest(block) -> str:
+        """Calculates a whitespace-insensitive digest of an .mgf block
+
+        Attributes:
+            block: List of lines of the .mgf block.
+
+        Returns:
+            The hexadecimal sha256 digest.
+        """
+        normalized = "\n".join(" ".join(line.split()) for line in block)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    @staticmethod
+    def iterate_keyed_spectra(mgf_file):
+        """Yields the spectra of an .mgf file together with their ID
+
+        Attributes:
+            mgf_file: Path of the .mgf spectral library.
+
+        Returns:
+            A generator of (key, block) tuples.
+
+        Raise:
+            ValueError: A spectrum has no ID or an ID occurs more than once.
+        """
+        seen = set()
+        for header, block in QueryManager.iterate_spectra(mgf_file):
+            key = header.get("ID")
+            if key is None:
+                raise ValueError(f"Spectrum without ID in '{mgf_file}'.")
+            if key in seen:
+                raise ValueError(f"Duplicate spectrum ID '{key}' in '{mgf_file}'.")
+            seen.add(key)
+            yield key, block
+
+    @staticmethod
+    def write_block(file, block):
+        """Writes an .mgf block to an open file"""
+        file.write("\n".join(block) + "\n\n")
+
+    @staticmethod
+    def diff_libraries(old_mgf_file, new_mgf_file, delta_folder) -> dict:
+        """Writes the spectra added, removed and changed between two library builds
+
+        Attributes:
+            old_mgf_file: Path of the previous .mgf spectral library.
+            new_mgf_file: Path of the new .mgf spectral library.
+            delta_folder: Folder the delta files are written to.
+
+        Returns:
+            Dictionary with the number of added, removed, changed and unchanged spectra.
+        """
+        delta_folder = Path(delta_folder)
+        delta_folder.mkdir(parents=True, exist_ok=True)
+        added_file, removed_file, changed_file = (
+            delta_folder.joinpath(name) for name in DiffManager.DELTA_FILES
+        )
+
+        old_digests = {
+            key: DiffManager.spectrum_digest(block)
+            for key, block in DiffManager.iterate_keyed_spectra(old_mgf_file)
+        }
+        counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+
+        with open(added_file, "w") as added, open(changed_file, "w") as changed:
+            for key, block in DiffManager.iterate_keyed_spectra(new_mgf_file):
+                old_digest = old_digests.pop(key, None)
+                if old_digest is None:
+                    DiffManager.write_block(added, block)
+                    counts["added"] += 1
+                elif old_digest != DiffManager.spectrum_digest(block):
+                    DiffManager.write_block(changed, block)
+                    counts["changed"] += 1
+                else:
+                    counts["unchanged"] += 1
+
+        with open(removed_file, "w") as removed:
+            for key, block in DiffManager.iterate_keyed_spectra(old_mgf_file):
+                if key in old_digests:
+                    DiffManager.write_block(removed, block)
+                    counts["removed"] += 1
+
+        return counts
+
+    @staticmethod
+    def patch_library(mgf_file, delta_folder, output_file, sort_by="pepmass") -> dict:
+        """Applies a delta to a library build
+
+        The patched library is sorted by sort_by, as written by PostprocessingManager,
+        so patching a published build reproduces the next build. If sort_by is None,
+        removed spectra are dropped, changed spectra are replaced in place and added
+        spectra are appended to the end of the library.
+        The patched library is written to a temporary file next to output_file and
+        only moved over output_file once the delta was validated, so output_file
+        may be the same as mgf_file.
+
+        Attributes:
+            mgf_file: Path of the .mgf spectral library to patch.
+            delta_folder: Folder containing the delta files written by diff_libraries.
+            output_file: Path of the patched .mgf spectral library.
+            sort_by: Sort order of the patched library, "pepmass" or "id", or None to
+             keep the order of the library.
+
+        Returns:
+            Dictionary with the number of added, removed and changed spectra.
+
+        Raise:
+            ValueError: The delta does not match the library or an added spectrum
+             is already in the library.
+        """
+        delta_folder = Path(delta_folder)
+        added_file, removed_file, changed_file = (
+            delta_folder.joinpath(name) for name in DiffManager.DELTA_FILES
+        )
+        removed = {key for key, _ in DiffManager.iterate_keyed_spectra(removed_file)}
+        changed = dict(DiffManager.iterate_keyed_spectra(changed_file))
+        added = {key for key, _ in DiffManager.iterate_keyed_spectra(added_file)}
+        counts = {"added": 0, "removed": 0, "changed": 0}
+
+        def _patched_spectra():
+            for key, block in DiffManager.iterate_keyed_spectra(mgf_file):
+                if key in added:
+                    raise ValueError(
+                        f"Added spectrum '{key}' is already in library '{mgf_file}'."
+                    )
+                if key in removed:
+                    counts["removed"] += 1
+                elif key in changed:
+                    counts["changed"] += 1
+                    yield changed[key]
+                else:
+                    yield block
+            for _, block in DiffManager.iterate_keyed_spectra(added_file):
+                counts["added"] += 1
+                yield block
+
+        output_file = Path(output_file)
+        fd, temp_file = tempfile.mkstemp(
+            suffix=".mgf.tmp", dir=output_file.parent.resolve()
+        )
+        os.close(fd)
+        try:
+            if sort_by is None:
+                with open(temp_file, "w") as outfile:
+                    for block in _patched_spectra():
+                        DiffManager.write_block(outfile, block)
+            else:
+                from fermo_core_extras.mibig_spectral_library.data_processing.class_sort_manager import (
+                    SortManager,
+                )
+
+                sorter = SortManager(
+                    sort_by=sort_by, temp_folder=str(output_file.parent)
+                )
+                for block in _patched_spectra():
+                    header = dict(line.split("=", 1) for line in block if "=" in line)
+                    sorter.add(header, "\n".join(block) + "\n\n")
+                sorter.write(temp_file)
+
+            if counts["removed"] != len(removed) or counts["changed"] != len(changed):
+                raise ValueError(
+                    f"Delta in '{delta_folder}' does not match library '{mgf_file}'."
+                )
+            os.replace(temp_file, output_file)
+        finally:
+            Path(temp_file).unlink(missing_ok=True)
+        return counts
@@ -37,6 +37,7 @@ class Logger(BaseModel):
     Attributes:
         logging_level: Lowest logging level that will be output to terminal
         output_folder: Path of the output folder containing intermediate files and the .mgf MIBiG spectral library
+        log_file_name: Name of the log file written to the output folder
 
     Raise:
         pydantic.ValidationError: Pydantic validation failed during instantiation.
@@ -44,12 +45,13 @@ class Logger(BaseModel):
 
     logging_level: str
     output_folder: str
+    log_file_name: str = "spectral_library_creator.log"
 
     def enable_logging(self: Self):
         """Enables colored logging throughout the mibig_spectral_library pipeline
 
         Returns:
-                logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+                logger: Logger instance that writes to terminal and log_file_name in s_output
         """
         logger = logging.getLogger(__name__)
         logger.setLevel(self.logging_level)
@@ -57,9 +59,7 @@ class Logger(BaseModel):
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(self.logging_level)
 
-        path_log_file = Path(self.output_folder).joinpath(
-            "spectral_library_creator.log"
-        )
+        path_log_file = Path(self.output_folder).joinpath(self.log_file_name)
         file_handler = logging.FileHandler(path_log_file, mode="w")
         file_handler.setLevel(self.logging_level)
 
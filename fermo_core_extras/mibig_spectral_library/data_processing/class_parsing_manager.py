@@ -22,71 +22,393 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os
 from argparse import ArgumentParser
 
 
 class ParsingManager:
     """Manages methods related to argparse-based command line argument parsing."""
 
-    @staticmethod
-    def run_parser(commandline_args):
-        """Parses user input and returns a formatted dictionary
+    FILTER_ARGUMENTS = (
+        "include_accessions",
+        "exclude_accessions",
+        "biosyn_class",
+        "organism",
+        "min_mass",
+        "max_mass",
+        "min_heavy_atoms",
+        "max_heavy_atoms",
+    )
 
-        Attributes:
-            commandline_args: Raw command line input from argv[1:].
+    @staticmethod
+    def build_parser():
+        """Builds the argument parser with one subparser per pipeline stage
 
         Returns:
-            args.mode: Mode that the program will be run in.
+            parser: ArgumentParser instance with the subcommands registered.
         """
         parser = ArgumentParser(
+            prog="mibig_spectral_library",
             description="Generates a spectral library from a folder of MIBiG entries"
-            " using CFM-ID"
+            " using CFM-ID",
+        )
+        subparsers = parser.add_subparsers(
+            dest="command", metavar="command", required=True
+        )
+
+        def _add_input(subparser):
+            subparser.add_argument(
+                "-i",
+                "--input",
+                help="Path of the mibig.json folder containing .json files.",
+                required=True,
+            )
+
+        def _add_output(subparser):
+            subparser.add_argument(
+                "-o",
+                "--output_folder",
+                help="Path of the output folder containing intermediate files and the"
+                " .mgf MIBiG spectral library",
+                required=True,
+            )
+
+        def _add_level(subparser):
+            subparser.add_argument(
+                "-l",
+                "--level",
+                help="Sets logging level for console and log file output. "
+                "Default=INFO",
+                default="INFO",
+                required=False,
+            )
+
+        def _add_mass_threshold(subparser):
+            subparser.add_argument(
+                "-m",
+                "--mass_threshold",
+                help="Sets a maximum molar mass threshold. CFM-ID can't analyse "
+                "extremely large molecules. Default=2000",
+                type=int,
+                default=2000,
+                required=False,
+            )
+
+        def _add_cfmid(subparser):
+            subparser.add_argument(
+                "-p",
+                "--prune",
+                help="Pruning threshold for CFM-ID. Values between 1 and 0. "
+                "Default=0.001",
+                type=float,
+                default=0.001,
+                required=False,
+            )
+            subparser.add_argument(
+                "-n",
+                "--niceness",
+                help="Set resource demand for CFM-ID using nice. "
+                "Value between 20 and 0 with 0 being the most demanding. Default=16",
+                type=int,
+                default=16,
+                required=False,
+            )
+
+        def _add_jobs(subparser):
+            subparser.add_argument(
+                "-j",
+                "--jobs",
+                help="Number of worker processes for the pre-flight validation of "
+                "compounds. Default=number of CPUs",
+                type=int,
+                default=os.cpu_count() or 1,
+                required=False,
+            )
+
+        def _add_filters(subparser):
+            subparser.add_argument(
+                "--include_accessions",
+                help="MIBiG accessions or accession ranges (BGC0000001-BGC0000100) to "
+                "include. Default=all",
+                nargs="+",
+                required=False,
+            )
+            subparser.add_argument(
+                "--exclude_accessions",
+                help="MIBiG accessions or accession ranges to exclude.",
+                nargs="+",
+                required=False,
+            )
+            subparser.add_argument(
+                "--biosyn_class",
+                help="Only include BGCs of this biosynthetic class (e.g. Polyketide).",
+                required=False,
+            )
+            subparser.add_argument(
+                "--organism",
+                help="Only include BGCs whose organism name contains this string.",
+                required=False,
+            )
+            subparser.add_argument(
+                "--min_mass",
+                help="Minimum molecular mass of included metabolites.",
+                type=float,
+                required=False,
+            )
+            subparser.add_argument(
+                "--max_mass",
+                help="Maximum molecular mass of included metabolites.",
+                type=float,
+                required=False,
+            )
+            subparser.add_argument(
+                "--min_heavy_atoms",
+                help="Minimum number of non-hydrogen atoms of included metabolites.",
+                type=int,
+                required=False,
+            )
+            subparser.add_argument(
+                "--max_heavy_atoms",
+                help="Maximum number of non-hydrogen atoms of included metabolites.",
+                type=int,
+                required=False,
+            )
+
+        def _add_reuse(subparser):
+            subparser.add_argument(
+                "-r",
+                "--reuse_predictions",
+                help="Folder with CFM-ID .log files of a previous build. Metabolites "
+                "with an existing prediction are not predicted again.",
+                required=False,
+            )
+
+        def _add_previous_library(subparser):
+            subparser.add_argument(
+                "--previous_library",
+                help="Path of the .mgf spectral library of a previous build. If given, "
+                "the added, removed and changed spectra are written to the folder "
+                "'delta' in the output folder.",
+                required=False,
+            )
+
+        def _add_profile(subparser):
+            subparser.add_argument(
+                "--profile",
+                help="Profiles each pipeline stage with cProfile and writes "
+                "profile_<stage>.prof and profile_<stage>.txt summary files to the "
+                "output folder.",
+                action="store_true",
+            )
+            subparser.add_argument(
+                "--profile_sample",
+                help="Only profiles the processing of N randomly sampled items (MIBiG "
+                "entries or spectra) per stage; the remaining work of the stage is "
+                "still profiled. Implies --profile.",
+                type=int,
+                required=False,
+            )
+
+        def _add_sorting(subparser):
+            subparser.add_argument(
+                "--sort_by",
+                help="Order of the spectra in the .mgf library: precursor m/z "
+                "(pepmass) or metabolite name (id). Default=pepmass",
+                choices=["pepmass", "id"],
+                default="pepmass",
+                required=False,
+            )
+            subparser.add_argument(
+                "--max_spectra_in_memory",
+                help="Maximum number of spectra kept in memory while writing the "
+                "sorted .mgf library. Default=10000",
+                type=int,
+                default=10000,
+                required=False,
+            )
+
+        run = subparsers.add_parser(
+            "run", help="Runs the complete pipeline (preprocess, predict, postprocess)."
+        )
+        _add_input(run)
+        _add_output(run)
+        _add_cfmid(run)
+        _add_level(run)
+        _add_profile(run)
+        _add_mass_threshold(run)
+        _add_jobs(run)
+        _add_filters(run)
+        _add_reuse(run)
+        _add_previous_library(run)
+        _add_sorting(run)
+
+        preprocess = subparsers.add_parser(
+            "preprocess",
+            help="Extracts and validates metabolites and metadata from the MIBiG "
+            "folder.",
+        )
+        _add_input(preprocess)
+        _add_output(preprocess)
+        _add_level(preprocess)
+        _add_profile(preprocess)
+        _add_mass_threshold(preprocess)
+        _add_jobs(preprocess)
+        _add_filters(preprocess)
+
+        predict = subparsers.add_parser(
+            "predict", help="Runs the CFM-ID prediction on the preprocessed input."
         )
-        parser.add_argument(
-            "-i",
-            "--input",
-            help="Path of the mibig.json folder containing .json files.",
+        _add_output(predict)
+        _add_cfmid(predict)
+        _add_level(predict)
+        _add_profile(predict)
+        _add_reuse(predict)
+
+        worker = subparsers.add_parser(
+            "worker",
+            help="Runs the CFM-ID prediction on one chunk of the preprocessed input.",
+        )
+        _add_output(worker)
+        _add_cfmid(worker)
+        _add_level(worker)
+        _add_profile(worker)
+        _add_reuse(worker)
+        worker.add_argument(
+            "--chunk",
+            help="Zero-based index of the chunk processed by this worker.",
+            type=int,
             required=True,
         )
-        parser.add_argument(
-            "-o",
-            "--output_folder",
-            help="Path of the output folder containing intermediate files and the .mgf"
-            " MIBiG spectral library",
+        worker.add_argument(
+            "--n_chunks",
+            help="Total number of chunks the preprocessed input is split into.",
+            type=int,
             required=True,
         )
-        parser.add_argument(
-            "-p",
-            "--prune",
-            help="Pruning threshold for CFM-ID. Values between 1 and 0. Default=0.001",
+
+        postprocess = subparsers.add_parser(
+            "postprocess",
+            help="Adds metadata to the CFM-ID output and generates the .mgf file.",
+        )
+        _add_output(postprocess)
+        _add_level(postprocess)
+        _add_profile(postprocess)
+        _add_previous_library(postprocess)
+        _add_sorting(postprocess)
+
+        query = subparsers.add_parser(
+            "query", help="Retrieves spectra from an existing .mgf spectral library."
+        )
+        query.add_argument(
+            "-f",
+            "--mgf_file",
+            help="Path of the .mgf spectral library to query.",
+            required=True,
+        )
+        query.add_argument(
+            "--id",
+            help="Metabolite name (ID field) of the spectrum to retrieve.",
             required=False,
-            default=0.001,
-        )
-        parser.add_argument(
-            "-n",
-            "--niceness",
-            help="Set resource demand for CFM-ID using nice. "
-            "Value between 20 and 0 with 0 being the most demanding. Default=16",
-            default=16,
+        )
+        query.add_argument(
+            "--mibig_id",
+            help="MIBiG accession (e.g. BGC0000001) of the spectra to retrieve.",
             required=False,
         )
-        parser.add_argument(
-            "-l",
-            "--level",
-            help="Sets logging level for console and log file output. Default=INFO",
-            default="INFO",
+        query.add_argument(
+            "--pepmass",
+            help="Precursor m/z of the spectra to retrieve.",
+            type=float,
             required=False,
         )
-        parser.add_argument(
-            "-m",
-            "--mass_threshold",
-            help="Sets a maximum molar mass threshold. CFM-ID can't analyse extremely large molecules. Default=2000",
-            default=2000,
+        query.add_argument(
+            "--tolerance",
+            help="Tolerance in m/z units used for the --pepmass lookup. Default=0.01",
+            type=float,
+            default=0.01,
             required=False,
         )
+
+        diff = subparsers.add_parser(
+            "diff",
+            help="Writes the spectra added, removed and changed between two .mgf "
+            "spectral libraries to a delta folder.",
+        )
+        diff.add_argument(
+            "-a",
+            "--old_mgf_file",
+            help="Path of the previous .mgf spectral library.",
+            required=True,
+        )
+        diff.add_argument(
+            "-b",
+            "--new_mgf_file",
+            help="Path of the new .mgf spectral library.",
+            required=True,
+        )
+        diff.add_argument(
+            "-d",
+            "--delta_folder",
+            help="Folder the delta files added.mgf, removed.mgf and changed.mgf are "
+            "written to.",
+            required=True,
+        )
+
+        patch = subparsers.add_parser(
+            "patch", help="Applies a delta folder to an .mgf spectral library."
+        )
+        patch.add_argument(
+            "-f",
+            "--mgf_file",
+            help="Path of the .mgf spectral library to patch.",
+            required=True,
+        )
+        patch.add_argument(
+            "-d",
+            "--delta_folder",
+            help="Folder containing the delta files written by the diff subcommand.",
+            required=True,
+        )
+        patch.add_argument(
+            "-o",
+            "--output_file",
+            help="Path of the patched .mgf spectral library.",
+            required=True,
+        )
+        patch.add_argument(
+            "--sort_by",
+            help="Sorts the patched library by precursor m/z (pepmass) or metabolite "
+            "name (id), like a fresh build; 'none' keeps the order of the library and "
+            "appends added spectra. Default=pepmass",
+            choices=["pepmass", "id", "none"],
+            default="pepmass",
+            required=False,
+        )
+        return parser
+
+    @staticmethod
+    def run_parser(commandline_args):
+        """Parses user input and returns a formatted dictionary
+
+        Attributes:
+            commandline_args: Raw command line input from argv[1:].
+
+        Returns:
+            args_dict: Dictionary of the parsed arguments, including the subcommand
+             under the key "command" and the subset selection arguments under the key
+             "filters".
+        """
+        parser = ParsingManager.build_parser()
         args = parser.parse_args(commandline_args)
         args_dict = {}
+        filters = {}
         for arg_name, arg_value in vars(args).items():
-            args_dict[arg_name] = arg_value
+            if arg_name in ParsingManager.FILTER_ARGUMENTS:
+                if arg_value is not None:
+                    filters[arg_name] = arg_value
+            else:
+                args_dict[arg_name] = arg_value
+        if args.command in ("run", "preprocess"):
+            args_dict["filters"] = filters
 
         return args_dict
@@ -24,11 +24,18 @@ SOFTWARE.
 
 import json
 from pathlib import Path
-from typing import Dict, Self
+from typing import Dict, List, Optional, Self
 
 import pandas as pd
 from pydantic import BaseModel
 
+from fermo_core_extras.mibig_spectral_library.data_processing.class_records import (
+    CompoundRecord,
+)
+from fermo_core_extras.mibig_spectral_library.data_processing.class_validation_manager import (
+    ValidationManager,
+)
+
 
 class PreprocessingManager(BaseModel):
     """
@@ -38,9 +45,22 @@ class PreprocessingManager(BaseModel):
         prepped_cfmid_file: Path of output file containing metabolite name, SMILES.
         prepped_metadata_file: Path of output file containing metabolite name, SMILES,
          chemical formula, molecular mass, database IDs, MIBiG entry ID.
-        mass_threshold: Threshold for maximum peptide mass.
-        bgc_dict: Dictionary with metabolite_name as key and metadata in a list as
-         values: SMILES, chemical formula, molecular mass, database IDs, MIBiG entry ID.
+        bgc_dict: Dictionary with metabolite_name as key and a CompoundRecord with
+         SMILES, chemical formula, molecular mass, database IDs, MIBiG entry IDs as
+         value.
+        rejected: List of (CompoundRecord, reason) tuples of metabolites that could
+         not be extracted.
+        include_accessions: MIBiG accessions or accession ranges
+         (BGC0000001-BGC0000100) to include; all BGCs if empty.
+        exclude_accessions: MIBiG accessions or accession ranges to exclude.
+        biosyn_class: Biosynthetic class a BGC must belong to, case-insensitive.
+        organism: Substring the organism name of a BGC must contain, case-insensitive.
+        min_mass: Minimum molecular mass of a metabolite.
+        max_mass: Maximum molecular mass of a metabolite.
+        min_heavy_atoms: Minimum number of non-hydrogen atoms of a metabolite, counted
+         in its largest component.
+        max_heavy_atoms: Maximum number of non-hydrogen atoms of a metabolite, counted
+         in its largest component.
 
     Raise:
         pydantic.ValidationError: Pydantic validation failed during instantiation.
@@ -49,59 +69,151 @@ class PreprocessingManager(BaseModel):
 
     prepped_cfmid_file: str
     prepped_metadata_file: str
-    mass_threshold: int
     bgc_dict: Dict = {}
+    rejected: List = []
+    include_accessions: List[str] = []
+    exclude_accessions: List[str] = []
+    biosyn_class: Optional[str] = None
+    organism: Optional[str] = None
+    min_mass: Optional[float] = None
+    max_mass: Optional[float] = None
+    min_heavy_atoms: Optional[int] = None
+    max_heavy_atoms: Optional[int] = None
+
+    @staticmethod
+    def parse_mass(value) -> Optional[float]:
+        """Converts a mol_mass entry to float
+
+        Arguments:
+            value: The mol_mass entry of a MIBiG compound.
+
+        Returns:
+            The mass as float or None if the entry is not numeric.
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def accession_in(accession: str, accession_list: List[str]) -> bool:
+        """Checks if a MIBiG accession is in a list of accessions or accession ranges
+
+        Arguments:
+            accession: MIBiG accession like "BGC0000001".
+            accession_list: List of accessions or ranges like "BGC0000001-BGC0000100".
+
+        Returns:
+            True if the accession is listed or within one of the ranges.
+        """
+        for entry in accession_list:
+            start, _, end = entry.partition("-")
+            if start <= accession <= (end or start):
+                return True
+        return False
+
+    def bgc_selected(self: Self, cluster: dict) -> bool:
+        """Checks if a BGC passes the accession, class and organism filters
+
+        Arguments:
+            cluster: The "cluster" entry of a MIBiG .json file.
+
+        Returns:
+            True if the compounds of the BGC should be extracted.
+        """
+        accession = cluster["mibig_accession"]
+        if self.include_accessions and not self.accession_in(
+            accession, self.include_accessions
+        ):
+            return False
+        if self.accession_in(accession, self.exclude_accessions):
+            return False
+        if self.biosyn_class is not None and self.biosyn_class.lower() not in (
+            biosyn_class.lower() for biosyn_class in cluster.get("biosyn_class", [])
+        ):
+            return False
+        if (
+            self.organism is not None
+            and self.organism.lower() not in cluster.get("organism_name", "").lower()
+        ):
+            return False
+        return True
 
     def extract_metadata(self: Self, file_path: str):
         """Extracts the relevant metadata from a .json file and
-        adds a new entry to bgc_dict for every metabolite found.
+        adds a new CompoundRecord to bgc_dict for every metabolite found.
+
+        BGCs not passing bgc_selected are skipped. Metabolites without name or
+        structure are added to rejected instead.
         """
         with open(file_path) as file:
             complete_bgc_dict = json.load(file)
+            if not self.bgc_selected(complete_bgc_dict["cluster"]):
+                return
+            mibig_accession = complete_bgc_dict["cluster"]["mibig_accession"]
             for metabolite in complete_bgc_dict["cluster"]["compounds"]:
-                if "compound" in metabolite:
-                    metadata_table = [metabolite["compound"]]
-                else:
-                    break
-                if "chem_struct" in metabolite:
-                    metadata_table.append(metabolite["chem_struct"])
-                else:
-                    break
-                if "molecular_formula" in metabolite:
-                    metadata_table.append(metabolite["molecular_formula"])
-                else:
-                    metadata_table.append("")
-                if "mol_mass" in metabolite:
-                    if int(metabolite["mol_mass"]) < self.mass_threshold:
-                        metadata_table.append(metabolite["mol_mass"])
-                    else:
-                        continue
-                else:
-                    metadata_table.append("")
-                if "database_id" in metabolite:
-                    metadata_table.append(
-                        str(metabolite["database_id"]).replace(" ", "")
-                    )
-                else:
-                    metadata_table.append("")
-                if metabolite["compound"] in self.bgc_dict:
-                    metadata_table.append(
-                        complete_bgc_dict["cluster"]["mibig_accession"]
-                        + ","
-                        + self.bgc_dict[metabolite["compound"]][4]
-                    )
-
-                else:
-                    metadata_table.append(
-                        complete_bgc_dict["cluster"]["mibig_accession"]
-                    )
-                self.bgc_dict[metadata_table[0]] = [
-                    metadata_table[1],
-                    metadata_table[2],
-                    metadata_table[3],
-                    metadata_table[4],
-                    metadata_table[5],
-                ]
+                record = CompoundRecord(
+                    name=str(metabolite.get("compound", "")).replace(" ", "_"),
+                    smiles=metabolite.get("chem_struct", ""),
+                    formula=metabolite.get("molecular_formula", ""),
+                    mol_mass=self.parse_mass(metabolite.get("mol_mass")),
+                    database_ids=str(metabolite.get("database_id", "")).replace(
+                        " ", ""
+                    ),
+                    mibig_ids=[mibig_accession],
+                )
+                if not record.name:
+                    self.rejected.append((record, "missing compound name"))
+                    continue
+                if not record.smiles:
+                    self.rejected.append((record, "missing SMILES"))
+                    continue
+                if record.name in self.bgc_dict:
+                    record.mibig_ids.extend(self.bgc_dict[record.name].mibig_ids)
+                self.bgc_dict[record.name] = record
+
+    def filter_records(self: Self) -> int:
+        """Removes metabolites outside the mass and heavy atom windows from bgc_dict
+
+        Metabolites without molecular mass are removed if a mass window is set, and
+        metabolites with unparsable SMILES if a heavy atom window is set.
+
+        Returns:
+            The number of removed metabolites.
+        """
+
+        def _in_window(value, minimum, maximum):
+            if minimum is not None and value < minimum:
+                return False
+            if maximum is not None and value > maximum:
+                return False
+            return True
+
+        selected = {}
+        for name, record in self.bgc_dict.items():
+            mass_window = self.min_mass is not None or self.max_mass is not None
+            if mass_window and (
+                record.mol_mass is None
+                or not _in_window(record.mol_mass, self.min_mass, self.max_mass)
+            ):
+                continue
+            if self.min_heavy_atoms is not None or self.max_heavy_atoms is not None:
+                try:
+                    components = ValidationManager.count_components(record.smiles)
+                except ValueError:
+                    continue
+                heavy_atoms = max(
+                    ValidationManager.count_heavy_atoms(counts) for counts in components
+                )
+                if not _in_window(
+                    heavy_atoms, self.min_heavy_atoms, self.max_heavy_atoms
+                ):
+                    continue
+            selected[name] = record
+
+        n_removed = len(self.bgc_dict) - len(selected)
+        self.bgc_dict = selected
+        return n_removed
 
     @staticmethod
     def extract_filenames(folder_path, extension):
@@ -126,8 +238,9 @@ class PreprocessingManager(BaseModel):
     def write_outfiles(self: Self):
         """Uses pandas to write space delimited .csv style files from the MIBiG data"""
         metadataframe = pd.DataFrame(
-            self.bgc_dict,
-            index=[
+            [record.to_row() for record in self.bgc_dict.values()],
+            columns=[
+                "metabolite_name",
                 "SMILES",
                 "chemical_formula",
                 "molecular_mass",
@@ -135,10 +248,7 @@ class PreprocessingManager(BaseModel):
                 "MIBiG_entry_ID",
             ],
         )
-        columns = metadataframe.columns.str.replace(" ", "_", regex=True)
-        metadataframe.columns = columns
-        metadataframe = metadataframe.T
-        metadataframe.to_csv(
-            self.prepped_metadata_file, sep=" ", index_label="metabolite_name"
+        metadataframe.to_csv(self.prepped_metadata_file, sep=" ", index=False)
+        metadataframe[["metabolite_name", "SMILES"]].to_csv(
+            self.prepped_cfmid_file, sep=" ", header=False, index=False
         )
-        metadataframe[["SMILES"]].to_csv(self.prepped_cfmid_file, sep=" ", header=False)
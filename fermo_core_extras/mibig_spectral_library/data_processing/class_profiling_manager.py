@@ -0,0 +1,140 @@
+"""Profiles the stages of the mibig_spectral_library pipeline.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import cProfile
+import io
+import pstats
+import random
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Self
+
+from pydantic import BaseModel
+
+
+class ProfilingManager(BaseModel):
+    """Wraps pipeline stages in cProfile and writes .prof files and summaries.
+
+    Attributes:
+        output_folder: Path of the folder the .prof files and summaries are written to.
+        sample_size: If set, only this many randomly sampled items per stage are
+         profiled; the work of the stage outside of the items is always profiled.
+        top_n: Number of functions listed per stage in the hotspot summary.
+        summaries: Dictionary with stage name as key and hotspot summary as value.
+        current: cProfile.Profile instance of the running stage, None outside stages.
+        skipped: Number of items of the running stage that were not profiled.
+        total: Number of items of the running stage.
+
+    Raise:
+        pydantic.ValidationError: Pydantic validation failed during instantiation.
+    """
+
+    output_folder: str
+    sample_size: Optional[int] = None
+    top_n: int = 25
+    summaries: Dict = {}
+    current: Optional[Any] = None
+    skipped: int = 0
+    total: int = 0
+
+    @contextmanager
+    def stage(self: Self, name: str):
+        """Profiles a pipeline stage and writes profile_<name>.prof and .txt
+
+        Arguments:
+            name: Name of the stage, used in the file names and summary.
+        """
+        self.current = cProfile.Profile()
+        self.skipped = 0
+        self.total = 0
+        start = time.perf_counter()
+        self.current.enable()
+        try:
+            yield self
+        finally:
+            self.current.disable()
+            elapsed = time.perf_counter() - start
+            profile_file = Path(self.output_folder).joinpath(f"profile_{name}.prof")
+            self.current.dump_stats(profile_file)
+            self.summaries[name] = self.summarize(name, elapsed)
+            self.current = None
+            self.write_summary(name)
+
+    def iterate(self: Self, items: list):
+        """Yields items, pausing the profiler for the items that were not sampled
+
+        Outside of a stage or without sample_size, the items are passed through and
+        the whole stage is profiled.
+
+        Arguments:
+            items: List of items processed in the stage, e.g. files or compounds.
+        """
+        if self.current is None or self.sample_size is None:
+            yield from items
+            return
+
+        sampled = set(
+            random.sample(range(len(items)), min(self.sample_size, len(items)))
+        )
+        self.total += len(items)
+        self.skipped += len(items) - len(sampled)
+        for index, item in enumerate(items):
+            if index in sampled:
+                yield item
+            else:
+                self.current.disable()
+                try:
+                    yield item
+                finally:
+                    self.current.enable()
+
+    def summarize(self: Self, name: str, elapsed: float) -> str:
+        """Returns the top_n functions of the current profile by cumulative time
+
+        Arguments:
+            name: Name of the stage.
+            elapsed: Wall time of the stage in seconds.
+        """
+        stream = io.StringIO()
+        if self.current.getstats():
+            stats = pstats.Stats(self.current, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        else:
+            stream.write("No calls were profiled.\n")
+        coverage = (
+            f", excluding {self.skipped} of {self.total} unsampled items"
+            if self.skipped
+            else ""
+        )
+        return f"=== {name} ({elapsed:.2f} s wall time{coverage})\n{stream.getvalue()}"
+
+    def write_summary(self: Self, name: str):
+        """Writes the summary of a profiled stage to profile_<name>.txt
+
+        Arguments:
+            name: Name of the stage.
+        """
+        with open(Path(self.output_folder).joinpath(f"profile_{name}.txt"), "w") as f:
+            f.write(self.summaries[name] + "\n")
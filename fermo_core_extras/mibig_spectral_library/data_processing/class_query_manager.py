@@ -0,0 +1,93 @@
+"""Retrieves spectra from an existing .mgf spectral library.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from pathlib import Path
+
+
+class QueryManager:
+    """Manages the lookup of spectra in an .mgf spectral library.
+
+    Only depends on the standard library so that short query invocations start fast.
+    """
+
+    @staticmethod
+    def iterate_spectra(mgf_file):
+        """Yields the spectra of an .mgf file one at a time
+
+        Attributes:
+            mgf_file: Path of the .mgf spectral library.
+
+        Returns:
+            A generator of (header, block) tuples, with header a dict of the
+             KEY=VALUE lines and block the raw lines of the spectrum.
+        """
+        header = {}
+        block = []
+        with open(Path(mgf_file)) as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                if line == "BEGIN IONS":
+                    header = {}
+                    block = [line]
+                    continue
+                block.append(line)
+                if line == "END IONS":
+                    yield header, block
+                elif "=" in line:
+                    key, value = line.split("=", 1)
+                    header[key] = value
+
+    @staticmethod
+    def run_query(
+        mgf_file, metabolite_id=None, mibig_id=None, pepmass=None, tolerance=0.01
+    ):
+        """Retrieves all spectra matching the given criteria
+
+        Attributes:
+            mgf_file: Path of the .mgf spectral library.
+            metabolite_id: Metabolite name as in the ID field.
+            mibig_id: MIBiG accession as in the MIBIGACCESSION field.
+            pepmass: Precursor m/z as in the PEPMASS field.
+            tolerance: Tolerance in m/z units for the pepmass lookup.
+
+        Returns:
+            matches: List of spectra, each a list of lines of the .mgf block.
+        """
+        matches = []
+        for header, block in QueryManager.iterate_spectra(mgf_file):
+            if metabolite_id is not None and header.get("ID") != metabolite_id:
+                continue
+            if mibig_id is not None and mibig_id not in header.get(
+                "MIBIGACCESSION", ""
+            ).split(","):
+                continue
+            if pepmass is not None and (
+                "PEPMASS" not in header
+                or abs(float(header["PEPMASS"]) - pepmass) > tolerance
+            ):
+                continue
+            matches.append(block)
+        return matches
@@ -0,0 +1,185 @@
+"""Compact record classes for compounds and spectra passed between the managers.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Self
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class CompoundRecord:
+    """Metadata of a single MIBiG compound.
+
+    Attributes:
+        name: Metabolite name with spaces replaced by underscores.
+        smiles: SMILES of the metabolite.
+        formula: Chemical formula of the metabolite, empty if unknown.
+        mol_mass: Molecular mass of the metabolite, None if unknown.
+        database_ids: Database IDs of the metabolite, empty if unknown.
+        mibig_ids: MIBiG accessions of the BGCs producing the metabolite.
+    """
+
+    name: str
+    smiles: str
+    formula: str = ""
+    mol_mass: Optional[float] = None
+    database_ids: str = ""
+    mibig_ids: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_row(cls, row: dict) -> Self:
+        """Creates a record from a row of the prepped metadata file
+
+        Arguments:
+            row: Dictionary with the column names of the metadata file as keys.
+
+        Returns:
+            A CompoundRecord instance.
+        """
+        mol_mass = row.get("molecular_mass", "")
+        mibig_ids = row.get("MIBiG_entry_ID", "")
+        return cls(
+            name=row["metabolite_name"],
+            smiles=row.get("SMILES", ""),
+            formula=row.get("chemical_formula", ""),
+            mol_mass=float(mol_mass) if mol_mass != "" else None,
+            database_ids=row.get("database_IDs", ""),
+            mibig_ids=mibig_ids.split(",") if mibig_ids != "" else [],
+        )
+
+    def to_row(self: Self) -> dict:
+        """Returns the record as a row of the prepped metadata file"""
+        return {
+            "metabolite_name": self.name,
+            "SMILES": self.smiles,
+            "chemical_formula": self.formula,
+            "molecular_mass": self.mol_mass,
+            "database_IDs": self.database_ids,
+            "MIBiG_entry_ID": ",".join(self.mibig_ids),
+        }
+
+
+@dataclass(slots=True)
+class SpectrumRecord:
+    """A single predicted MS/MS spectrum with its .mgf header fields.
+
+    Attributes:
+        name: Metabolite name (ID field).
+        insilico: Description of the in silico spectrum type.
+        predicted_by: Name and version of the predicting program.
+        smiles: SMILES of the metabolite.
+        inchikey: InChIKey of the metabolite.
+        formula: Chemical formula of the metabolite.
+        pepmass: Precursor m/z.
+        mz: float64 array of fragment m/z values.
+        intensity: float32 array of fragment intensities.
+        mibig_accession: Comma-separated MIBiG accessions, empty if unknown.
+    """
+
+    name: str
+    insilico: str
+    predicted_by: str
+    smiles: str
+    inchikey: str
+    formula: str
+    pepmass: float
+    mz: np.ndarray
+    intensity: np.ndarray
+    mibig_accession: str = ""
+
+    @classmethod
+    def from_cfmid_log(cls, file_path: str) -> Self:
+        """Parses a CFM-ID .log file, merging the peaks of all collision energies
+
+        Duplicate m/z values across energies are collapsed to the most intense peak
+        and the peaks are ordered by descending intensity.
+
+        Arguments:
+            file_path: Path to the CFM-ID .log file.
+
+        Returns:
+            A SpectrumRecord instance.
+        """
+        header = {}
+        mz = []
+        intensity = []
+        with open(file_path) as file:
+            for line in file:
+                if line.startswith("#"):
+                    if line.startswith("#In-silico"):
+                        key, value = "INSILICO", line[10:]
+                    elif line.startswith("#PREDICTED BY"):
+                        key, value = "PREDICTEDBY", line[13:]
+                    else:
+                        key, _, value = line[1:].partition("=")
+                    header[key] = value.strip().replace(" ", "")
+                elif line.startswith("energy"):
+                    continue
+                elif line.strip() == "":
+                    break
+                else:
+                    fields = line.split(maxsplit=2)
+                    mz.append(fields[0])
+                    intensity.append(fields[1])
+
+        mz = np.array(mz, dtype=np.float64)
+        intensity = np.array(intensity, dtype=np.float32)
+        order = np.argsort(-intensity, kind="stable")
+        mz, intensity = mz[order], intensity[order]
+        _, first = np.unique(mz, return_index=True)
+        keep = np.sort(first)
+
+        return cls(
+            name=header.get("ID", ""),
+            insilico=header.get("INSILICO", ""),
+            predicted_by=header.get("PREDICTEDBY", ""),
+            smiles=header.get("SMILES", ""),
+            inchikey=header.get("InChiKey", ""),
+            formula=header.get("Formula", ""),
+            pepmass=float(header.get("PMass", "nan")),
+            mz=mz[keep],
+            intensity=intensity[keep],
+        )
+
+    def to_mgf(self: Self) -> str:
+        """Returns the spectrum as an .mgf formatted block"""
+        lines = [
+            "BEGIN IONS",
+            f"INSILICO={self.insilico}",
+            f"PREDICTEDBY={self.predicted_by}",
+            f"ID={self.name}",
+            f"SMILES={self.smiles}",
+            f"INCHIKEY={self.inchikey}",
+            f"FORMULA={self.formula}",
+            f"PEPMASS={self.pepmass:.5f}",
+        ]
+        if self.mibig_accession:
+            lines.append(f"MIBIGACCESSION={self.mibig_accession}")
+        lines.extend(
+            f"{mz:.5f} {intensity:.2f}"
+            for mz, intensity in zip(self.mz.tolist(), self.intensity.tolist())
+        )
+        lines.append("END IONS")
+        return "\n".join(lines) + "\n\n"
@@ -23,48 +23,78 @@ SOFTWARE.
 """
 
 import os
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Self
+from typing import Any, Dict, Literal, Optional, Self
 
-from pydantic import BaseModel
-
-from fermo_core_extras.mibig_spectral_library.data_processing.class_cfmid_manager import (
-    CfmidManager,
-)
-from fermo_core_extras.mibig_spectral_library.data_processing.class_logger import Logger
-from fermo_core_extras.mibig_spectral_library.data_processing.class_postprocessing_manager import (
-    PostprocessingManager,
-)
-from fermo_core_extras.mibig_spectral_library.data_processing.class_preprocessing_manager import (
-    PreprocessingManager,
-)
+from pydantic import BaseModel, PrivateAttr
 
 
 class LibraryPrep(BaseModel):
     """Class that manages the other MIBiG spectral library classes.
 
+    The manager classes are imported inside the methods that use them, so that
+    subcommands only pay for the dependencies (pandas, coloredlogs) they need.
+
     Attributes:
-        input: Path of the mibig.json folder containing .json files.
         output_folder: Path of the output folder containing intermediate files and the .mgf MIBiG spectral library.
+        input: Path of the mibig.json folder containing .json files.
         prune: Probability below which metabolite fragments will be excluded from predictions.
         niceness: Niceness value to run the CFM-ID analysis in.
         level: Logging level that will be used in the library.
         mass_threshold: Threshold for maximum peptide mass.
+        jobs: Number of worker processes used for the pre-flight validation.
+        filters: Subset selection arguments passed to PreprocessingManager, e.g.
+         include_accessions, biosyn_class, min_mass or max_heavy_atoms.
+        reuse_predictions: Folder with CFM-ID .log files of a previous build; these
+         metabolites are not predicted again.
+        previous_library: .mgf spectral library of a previous build to compare the
+         new library against.
+        sort_by: Order of the spectra in the .mgf library, "pepmass" or "id".
+        max_spectra_in_memory: Maximum number of spectra kept in memory while
+         writing the sorted .mgf library.
+        profile: Profiles each stage with cProfile and writes .prof files and
+         summaries to the output folder.
+        profile_sample: Only profiles the processing of this many randomly sampled
+         items per stage, besides the remaining work of the stage; implies profile.
 
     Raise:
         pydantic.ValidationError: Pydantic validation failed during instantiation.
     """
 
-    input: str
     output_folder: str
-    prune: float
-    niceness: int
-    level: str
-    mass_threshold: int
+    input: Optional[str] = None
+    prune: float = 0.001
+    niceness: int = 16
+    level: str = "INFO"
+    mass_threshold: int = 2000
+    jobs: int = 1
+    filters: Dict = {}
+    reuse_predictions: Optional[str] = None
+    previous_library: Optional[str] = None
+    sort_by: Literal["pepmass", "id"] = "pepmass"
+    max_spectra_in_memory: int = 10000
+    profile: bool = False
+    profile_sample: Optional[int] = None
+    _profiler: Optional[Any] = PrivateAttr(default=None)
 
-    def process_mibig(self: Self):
+    def process_mibig(self: Self, logger):
         """Processes the .json files from MIBiG into input for CFM-ID and
-        metadata file."""
+        metadata file, rejecting compounds that fail the pre-flight validation.
+
+        Arguments:
+            logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+        """
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_preprocessing_manager import (
+            PreprocessingManager,
+        )
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_validation_manager import (
+            ValidationManager,
+        )
+
+        if self.input is None:
+            raise ValueError("No MIBiG input folder was specified.")
+
         args_dict = {
             "prepped_cfmid_file": str(
                 Path(self.output_folder).joinpath("cfm_id_input.txt")
@@ -72,23 +102,80 @@ class LibraryPrep(BaseModel):
             "prepped_metadata_file": str(
                 Path(self.output_folder).joinpath("mibig_metadata.csv")
             ),
-            "mass_threshold": self.mass_threshold,
         }
+        args_dict.update(self.filters)
         preprocessed_data = PreprocessingManager(**args_dict)
         file_list = preprocessed_data.extract_filenames(self.input, ".json")
-        for file_path in file_list:
+        for file_path in self.iterate_profiled(file_list):
             preprocessed_data.extract_metadata(file_path)
+
+        args_dict = {
+            "mass_threshold": self.mass_threshold,
+            "rejection_file": str(
+                Path(self.output_folder).joinpath("mibig_rejected_compounds.csv")
+            ),
+            "jobs": self.jobs,
+        }
+        validation = ValidationManager(**args_dict)
+        accepted, rejected = validation.validate_records(
+            list(preprocessed_data.bgc_dict.values())
+        )
+        preprocessed_data.bgc_dict = {record.name: record for record in accepted}
+        n_filtered = preprocessed_data.filter_records()
+        rejected = preprocessed_data.rejected + rejected
+        validation.write_rejection_report(rejected)
+        logger.info(
+            f"Pre-flight validation accepted {len(accepted)} and rejected "
+            f"{len(rejected)} compounds (see {validation.rejection_file})"
+        )
+        logger.info(
+            f"Selected {len(preprocessed_data.bgc_dict)} compounds, {n_filtered} "
+            f"removed by the mass and heavy atom filters"
+        )
+
         preprocessed_data.write_outfiles()
 
-    def run_cfmid(self: Self, logger):
+    def run_cfmid(self: Self, logger, prepped_cfmid_file: Optional[Path] = None):
         """Builds and executes the command to run CFM-ID in dockerized environment
         using nice -16
 
         Arguments:
             logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+            prepped_cfmid_file: Optional CFM-ID input file; defaults to the complete
+             cfm_id_input.txt in the output folder.
         """
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_cfmid_manager import (
+            CfmidManager,
+        )
+
+        if prepped_cfmid_file is None:
+            prepped_cfmid_file = Path(self.output_folder).joinpath("cfm_id_input.txt")
+
+        if self.reuse_predictions is not None:
+            args_dict = {
+                "prepped_cfmid_file": prepped_cfmid_file,
+                "cfm_id_folder": Path(self.output_folder).joinpath(
+                    "cfm_id_predicted_spectra"
+                ),
+                "prune_probability": self.prune,
+                "niceness": self.niceness,
+            }
+            pending_file = Path(self.output_folder).joinpath(
+                f"{prepped_cfmid_file.stem}_pending.txt"
+            )
+            n_reused, n_pending = CfmidManager(**args_dict).write_pending(
+                pending_file, Path(self.reuse_predictions)
+            )
+            logger.info(
+                f"Reusing {n_reused} existing predictions, {n_pending} metabolites "
+                f"left to predict"
+            )
+            if n_pending == 0:
+                return
+            prepped_cfmid_file = pending_file
+
         args_dict = {
-            "prepped_cfmid_file": Path(self.output_folder).joinpath("cfm_id_input.txt"),
+            "prepped_cfmid_file": prepped_cfmid_file,
             "cfm_id_folder": Path(self.output_folder).joinpath(
                 "cfm_id_predicted_spectra"
             ),
@@ -98,8 +185,40 @@ class LibraryPrep(BaseModel):
         spectra = CfmidManager(**args_dict)
         spectra.run_program(logger)
 
+    def run_cfmid_chunk(self: Self, logger, chunk: int, n_chunks: int):
+        """Runs CFM-ID on a single chunk of cfm_id_input.txt
+
+        Allows splitting the prediction over several independent worker processes
+        that write to the same cfm_id_predicted_spectra folder.
+
+        Arguments:
+            logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+            chunk: Zero-based index of the chunk to process.
+            n_chunks: Total number of chunks.
+        """
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_cfmid_manager import (
+            CfmidManager,
+        )
+
+        chunk_file = CfmidManager.write_chunk(
+            prepped_cfmid_file=Path(self.output_folder).joinpath("cfm_id_input.txt"),
+            chunk_file=Path(self.output_folder).joinpath(
+                f"cfm_id_input_chunk_{chunk}.txt"
+            ),
+            chunk=chunk,
+            n_chunks=n_chunks,
+        )
+        self.run_cfmid(logger, prepped_cfmid_file=chunk_file)
+
     def run_metadata(self: Self):
         """Adds real mass, publication IDs and MIBiG cluster IDs to CFM-ID output."""
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_postprocessing_manager import (
+            PostprocessingManager,
+        )
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_preprocessing_manager import (
+            PreprocessingManager,
+        )
+
         args_dict = {
             "cfm_id_folder": str(
                 Path(self.output_folder).joinpath("cfm_id_predicted_spectra")
@@ -110,28 +229,96 @@ class LibraryPrep(BaseModel):
             "mgf_file": str(
                 Path(self.output_folder).joinpath("mibig_spectral_library.mgf")
             ),
+            "sort_by": self.sort_by,
+            "max_spectra_in_memory": self.max_spectra_in_memory,
         }
         metadata = PostprocessingManager(**args_dict)
         file_list = PreprocessingManager.extract_filenames(
             f"{self.output_folder}/cfm_id_predicted_spectra", ".log"
         )
         metadata.extract_metadata()
-        metadata.add_metadata_cfmid_files(file_list)
-        metadata.format_log_dict()
+        for file_name in self.iterate_profiled(file_list):
+            metadata.add_metadata_cfmid_files([file_name])
         metadata.write_mgf_to_file()
 
+    def run_diff(self: Self, logger):
+        """Writes the delta between previous_library and the new library to the
+        folder 'delta' in the output folder.
+
+        Arguments:
+            logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+        """
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_diff_manager import (
+            DiffManager,
+        )
+
+        delta_folder = Path(self.output_folder).joinpath("delta")
+        counts = DiffManager.diff_libraries(
+            old_mgf_file=self.previous_library,
+            new_mgf_file=Path(self.output_folder).joinpath(
+                "mibig_spectral_library.mgf"
+            ),
+            delta_folder=delta_folder,
+        )
+        logger.info(
+            f"Delta to previous library written to {delta_folder}: "
+            + ", ".join(f"{count} {name}" for name, count in counts.items())
+        )
+
+    def profile_stage(self: Self, name: str):
+        """Returns a context manager profiling a pipeline stage if profiling is on
+
+        Arguments:
+            name: Name of the stage, used for profile_<name>.prof.
+        """
+        if not self.profile and self.profile_sample is None:
+            return nullcontext()
+
+        if self._profiler is None:
+            from fermo_core_extras.mibig_spectral_library.data_processing.class_profiling_manager import (
+                ProfilingManager,
+            )
+
+            self._profiler = ProfilingManager(
+                output_folder=self.output_folder, sample_size=self.profile_sample
+            )
+        return self._profiler.stage(name)
+
+    def iterate_profiled(self: Self, items: list):
+        """Iterates over the items of a stage, profiling a sample if requested
+
+        Arguments:
+            items: List of items processed in the stage.
+        """
+        if self._profiler is None:
+            return iter(items)
+        return self._profiler.iterate(items)
+
     def make_output_folder(self: Self):
         """Check for the existence of the output folder and makes one if required"""
         if not os.path.isdir(self.output_folder):
             os.makedirs(self.output_folder)
 
-    def run_logger(self: Self):
+    def run_logger(self: Self, log_file_name: str = "spectral_library_creator.log"):
         """Enables colored logging throughout the mibig_spectral_library pipeline
 
+        Arguments:
+            log_file_name: Name of the log file in the output folder. Subcommands use
+             separate files so that running them one after another or in parallel
+             does not overwrite earlier logs.
+
         Returns:
-            logger: Logger instance that writes to terminal and spectral_library_creator.log in s_output
+            logger: Logger instance that writes to terminal and the log file in s_output
         """
-        args_dict = {"logging_level": self.level, "output_folder": self.output_folder}
+        from fermo_core_extras.mibig_spectral_library.data_processing.class_logger import (
+            Logger,
+        )
+
+        args_dict = {
+            "logging_level": self.level,
+            "output_folder": self.output_folder,
+            "log_file_name": log_file_name,
+        }
         logging = Logger(**args_dict)
         logger = logging.enable_logging()
         return logger
@@ -0,0 +1,172 @@
+"""Writes .mgf spectral libraries in a deterministic order using bounded memory.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import heapq
+import math
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Literal, Optional, Self
+
+from pydantic import BaseModel
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_query_manager import (
+    QueryManager,
+)
+
+
+class SortManager(BaseModel):
+    """External merge sort of .mgf blocks.
+
+    Blocks are buffered until max_in_memory is reached, then sorted and spilled to a
+    run file. On writing, the runs are merged with at most fan_in open files per
+    merge pass, so memory use does not depend on the size of the library.
+
+    Attributes:
+        sort_by: Sort by "pepmass" (precursor m/z, then ID) or by "id".
+        max_in_memory: Maximum number of spectra kept in memory.
+        fan_in: Maximum number of runs merged at once.
+        temp_folder: Folder in which the temporary run folder is created; defaults
+         to the system temporary folder.
+        buffer: List of (key, block) tuples not yet spilled.
+        runs: List of paths of the spilled, sorted run files.
+        run_folder: Temporary folder containing the run files.
+        n_run_files: Number of run files created, used to name new run files.
+
+    Raise:
+        pydantic.ValidationError: Pydantic validation failed during instantiation.
+    """
+
+    sort_by: Literal["pepmass", "id"] = "pepmass"
+    max_in_memory: int = 10000
+    fan_in: int = 64
+    temp_folder: Optional[str] = None
+    buffer: List = []
+    runs: List = []
+    run_folder: Optional[str] = None
+    n_run_files: int = 0
+
+    @staticmethod
+    def sort_key(header: dict, sort_by: str) -> tuple:
+        """Returns the sort key of a spectrum
+
+        Arguments:
+            header: Dictionary of the KEY=VALUE lines of the .mgf block.
+            sort_by: "pepmass" or "id".
+
+        Returns:
+            (precursor m/z, ID) for "pepmass", (ID,) for "id". A missing or
+            non-finite precursor m/z is sorted last, ordered by ID.
+        """
+        if sort_by == "pepmass":
+            try:
+                pepmass = float(header.get("PEPMASS", "inf"))
+            except ValueError:
+                pepmass = math.inf
+            if not math.isfinite(pepmass):
+                pepmass = math.inf
+            return pepmass, header.get("ID", "")
+        return (header.get("ID", ""),)
+
+    def add(self: Self, header: dict, block: str):
+        """Adds an .mgf block, spilling a sorted run if the buffer is full
+
+        Arguments:
+            header: Dictionary with at least the ID and PEPMASS of the spectrum.
+            block: The .mgf formatted block, from BEGIN IONS to END IONS.
+        """
+        self.buffer.append((self.sort_key(header, self.sort_by), block))
+        if len(self.buffer) >= self.max_in_memory:
+            self.spill()
+
+    def new_run_file(self: Self) -> Path:
+        """Returns the path of a new run file in the temporary run folder"""
+        if self.run_folder is None:
+            self.run_folder = tempfile.mkdtemp(prefix="mgf_runs_", dir=self.temp_folder)
+        self.n_run_files += 1
+        return Path(self.run_folder).joinpath(f"run_{self.n_run_files}.mgf")
+
+    def spill(self: Self):
+        """Sorts the buffer and writes it to a new run file"""
+        if not self.buffer:
+            return
+        self.buffer.sort(key=lambda item: item[0])
+        run_file = self.new_run_file()
+        with open(run_file, "w") as f:
+            for _, block in self.buffer:
+                f.write(block)
+        self.runs.append(run_file)
+        self.buffer = []
+
+    def iterate_run(self: Self, run_file):
+        """Yields the (key, block) tuples of a run file"""
+        for header, block in QueryManager.iterate_spectra(run_file):
+            yield self.sort_key(header, self.sort_by), "\n".join(block) + "\n\n"
+
+    def merge_runs(self: Self, run_files: list, output_file):
+        """Merges sorted run files into a single sorted file
+
+        Arguments:
+            run_files: List of paths of sorted run files.
+            output_file: Path of the merged file.
+        """
+        with open(output_file, "w") as f:
+            for _, block in heapq.merge(
+                *(self.iterate_run(run_file) for run_file in run_files),
+                key=lambda item: item[0],
+            ):
+                f.write(block)
+
+    def write(self: Self, output_file):
+        """Writes all added blocks in sorted order and removes the run files
+
+        Arguments:
+            output_file: Path of the sorted .mgf file.
+        """
+        try:
+            if not self.runs:
+                self.buffer.sort(key=lambda item: item[0])
+                with open(output_file, "w") as f:
+                    for _, block in self.buffer:
+                        f.write(block)
+                return
+
+            self.spill()
+            while len(self.runs) > self.fan_in:
+                merged_runs = []
+                for start in range(0, len(self.runs), self.fan_in):
+                    merged_file = self.new_run_file()
+                    self.merge_runs(self.runs[start : start + self.fan_in], merged_file)
+                    merged_runs.append(merged_file)
+                for run_file in self.runs:
+                    Path(run_file).unlink()
+                self.runs = merged_runs
+            self.merge_runs(self.runs, output_file)
+        finally:
+            if self.run_folder is not None:
+                shutil.rmtree(self.run_folder, ignore_errors=True)
+            self.buffer = []
+            self.runs = []
+            self.run_folder = None
+            self.n_run_files = 0
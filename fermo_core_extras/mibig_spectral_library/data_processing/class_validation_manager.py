@@ -0,0 +1,352 @@
+"""Validates MIBiG compounds before they are passed to CFM-ID.
+
+Copyright (c) 2022 to present Koen van Ingen, Mitja M. Zdouc, PhD and individual
+ contributors.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Self, Tuple
+
+import pandas as pd
+from pydantic import BaseModel
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_records import (
+    CompoundRecord,
+)
+
+MONOISOTOPIC_MASSES = {
+    "H": 1.00782503207,
+    "C": 12.0,
+    "N": 14.0030740048,
+    "O": 15.99491461956,
+    "F": 18.99840322,
+    "P": 30.97376163,
+    "S": 31.97207100,
+    "Cl": 34.96885268,
+    "Br": 78.9183371,
+    "I": 126.904473,
+    "Na": 22.98976928,
+    "Mg": 23.9850417,
+    "K": 38.96370668,
+    "Ca": 39.96259098,
+    "Mn": 54.9380451,
+    "Fe": 55.9349375,
+    "Co": 58.933195,
+    "Ni": 57.9353429,
+    "Cu": 62.9295975,
+    "Zn": 63.9291422,
+    "B": 11.0093054,
+    "Si": 27.9769265,
+    "As": 74.9215965,
+    "Se": 79.9165213,
+}
+
+DEFAULT_VALENCES = {
+    "B": (3,),
+    "C": (4,),
+    "N": (3, 5),
+    "O": (2,),
+    "P": (3, 5),
+    "S": (2, 4, 6),
+    "F": (1,),
+    "Cl": (1,),
+    "Br": (1,),
+    "I": (1,),
+}
+
+BOND_ORDERS = {"-": 1, "/": 1, "\\": 1, ":": 1, "=": 2, "#": 3, "$": 4}
+
+SMILES_TOKEN = re.compile(
+    r"\[[^\]]+]|Br|Cl|[BCNOSPFI*]|[bcnosp]|[()=#$:/\\.\-]|%\d{2}|\d"
+)
+BRACKET_ATOM = re.compile(
+    r"\[(?:\d+)?(?P<element>[A-Z][a-z]?|[a-z][a-z]?|\*)"
+    r"(?:@(?:@|TH[12]|AL[12]|SP[1-3]|TB\d{1,2}|OH\d{1,2})?)?"
+    r"(?:H(?P<hcount>\d*))?(?:[+-]+\d*)?(?::\d+)?]"
+)
+FORMULA_TOKEN = re.compile(r"([A-Z][a-z]?)(\d*)")
+
+
+class ValidationManager(BaseModel):
+    """Checks compounds cheaply before the CFM-ID prediction and reports rejections.
+
+    Attributes:
+        mass_threshold: Threshold for maximum molecular mass.
+        rejection_file: Path of the report listing rejected compounds and reasons.
+        jobs: Number of worker processes used for validation.
+
+    Raise:
+        pydantic.ValidationError: Pydantic validation failed during instantiation.
+    """
+
+    mass_threshold: int
+    rejection_file: str
+    jobs: int = 1
+
+    @staticmethod
+    def mass_from_formula(formula: str) -> Optional[float]:
+        """Calculates the monoisotopic mass from a chemical formula
+
+        Arguments:
+            formula: Chemical formula like "C19H22O6".
+
+        Returns:
+            The monoisotopic mass or None if the formula could not be interpreted.
+        """
+        formula = formula.replace(" ", "")
+        tokens = FORMULA_TOKEN.findall(formula)
+        if not formula or "".join(e + n for e, n in tokens) != formula:
+            return None
+        mass = 0.0
+        for element, count in tokens:
+            if element not in MONOISOTOPIC_MASSES:
+                return None
+            mass += MONOISOTOPIC_MASSES[element] * int(count or 1)
+        return mass
+
+    @staticmethod
+    def count_smiles_atoms(smiles: str) -> dict:
+        """Counts the atoms, including implicit hydrogens, of a SMILES string
+
+        Arguments:
+            smiles: SMILES of a single molecule.
+
+        Returns:
+            Dictionary with elements as keys and atom counts as values.
+
+        Raise:
+            ValueError: The SMILES is malformed or not supported.
+        """
+        tokens = SMILES_TOKEN.findall(smiles)
+        if "".join(tokens) != smiles:
+            raise ValueError("SMILES contains unsupported characters")
+
+        atoms = []
+        branches = []
+        rings = {}
+        previous = None
+        bond = None
+
+        def _connect(first, second, order):
+            for atom in (first, second):
+                atoms[atom]["bonds"] += order
+
+        for token in tokens:
+            if token == ".":
+                raise ValueError("multi-component SMILES is not supported")
+            elif token in BOND_ORDERS:
+                bond = BOND_ORDERS[token]
+            elif token == "(":
+                if previous is None:
+                    raise ValueError("branch without preceding atom")
+                branches.append(previous)
+            elif token == ")":
+                if not branches:
+                    raise ValueError("unbalanced parentheses")
+                previous = branches.pop()
+            elif token[0] == "%" or token.isdigit():
+                if previous is None:
+                    raise ValueError("ring bond without preceding atom")
+                if token in rings:
+                    partner, partner_bond = rings.pop(token)
+                    _connect(previous, partner, bond or partner_bond or 1)
+                else:
+                    rings[token] = (previous, bond)
+                bond = None
+            else:
+                if token.startswith("["):
+                    match = BRACKET_ATOM.fullmatch(token)
+                    if match is None:
+                        raise ValueError(f"malformed bracket atom '{token}'")
+                    element = match.group("element")
+                    hcount = match.group("hcount")
+                    atom = {
+                        "element": element.capitalize(),
+                        "aromatic": element.islower(),
+                        "hydrogens": (int(hcount or 1) if hcount is not None else 0),
+                        "bonds": 0,
+                        "bracket": True,
+                    }
+                else:
+                    atom = {
+                        "element": token.capitalize(),
+                        "aromatic": token.islower(),
+                        "hydrogens": 0,
+                        "bonds": 0,
+                        "bracket": False,
+                    }
+                atoms.append(atom)
+                if previous is not None:
+                    _connect(previous, len(atoms) - 1, bond or 1)
+                previous = len(atoms) - 1
+                bond = None
+
+        if not atoms:
+            raise ValueError("SMILES contains no atoms")
+        if branches:
+            raise ValueError("unbalanced parentheses")
+        if rings:
+            raise ValueError("unclosed ring bond")
+
+        counts = {}
+        for atom in atoms:
+            element = atom["element"]
+            counts[element] = counts.get(element, 0) + 1
+            hydrogens = atom["hydrogens"]
+            if not atom["bracket"] and element in DEFAULT_VALENCES:
+                if atom["aromatic"]:
+                    if element in ("O", "S"):
+                        hydrogens = 0
+                    else:
+                        hydrogens = DEFAULT_VALENCES[element][0] - atom["bonds"] - 1
+                else:
+                    valences = DEFAULT_VALENCES[element]
+                    valence = next(
+                        (v for v in valences if v >= atom["bonds"]), valences[-1]
+                    )
+                    hydrogens = valence - atom["bonds"]
+            counts["H"] = counts.get("H", 0) + max(0, math.floor(hydrogens))
+        return counts
+
+    @staticmethod
+    def count_components(smiles: str) -> List[dict]:
+        """Counts the atoms of each component of a (multi-component) SMILES string
+
+        Arguments:
+            smiles: SMILES, with components like counter-ions separated by ".".
+
+        Returns:
+            List of dictionaries with elements as keys and atom counts as values.
+
+        Raise:
+            ValueError: A component is empty, malformed or not supported.
+        """
+        return [
+            ValidationManager.count_smiles_atoms(component)
+            for component in smiles.split(".")
+        ]
+
+    @staticmethod
+    def count_heavy_atoms(counts: dict) -> int:
+        """Returns the number of non-hydrogen atoms of an atom count dictionary"""
+        return sum(count for element, count in counts.items() if element != "H")
+
+    @staticmethod
+    def check_compound(
+        record: CompoundRecord, mass_threshold: int
+    ) -> Tuple[CompoundRecord, Optional[str]]:
+        """Checks a single compound and fills in a missing molecular mass
+
+        Multi-component SMILES (salts, metal complexes) are accepted if every
+        component is well-formed. Compounds are not rejected for their elements,
+        since CFM-ID predicts spectra for any structure RDKit can read. If the
+        mass of an element is unknown, the threshold is checked against the mass
+        of the remaining atoms and the molecular mass is left empty.
+
+        Arguments:
+            record: CompoundRecord to check.
+            mass_threshold: Threshold for maximum molecular mass.
+
+        Returns:
+            Tuple of the (possibly updated) record and the rejection reason, which is
+             None if the compound passed all checks.
+        """
+        smiles = record.smiles
+        if not smiles:
+            return record, "missing SMILES"
+        if any(char.isspace() for char in smiles):
+            return record, "SMILES contains whitespace"
+        try:
+            components = ValidationManager.count_components(smiles)
+        except ValueError as e:
+            return record, f"malformed SMILES: {e}"
+
+        counts = {}
+        for component in components:
+            for element, count in component.items():
+                counts[element] = counts.get(element, 0) + count
+        known_mass = sum(
+            MONOISOTOPIC_MASSES[element] * count
+            for element, count in counts.items()
+            if element in MONOISOTOPIC_MASSES
+        )
+
+        if record.mol_mass is None:
+            record.mol_mass = ValidationManager.mass_from_formula(record.formula)
+        if record.mol_mass is None and set(counts) <= set(MONOISOTOPIC_MASSES):
+            record.mol_mass = known_mass
+        mass = record.mol_mass if record.mol_mass is not None else known_mass
+        if mass >= mass_threshold:
+            return record, (
+                f"molecular mass {mass:.4f} exceeds threshold " f"{mass_threshold}"
+            )
+        return record, None
+
+    def validate_records(
+        self: Self, records: List[CompoundRecord]
+    ) -> Tuple[List[CompoundRecord], List[Tuple[CompoundRecord, str]]]:
+        """Checks all records, in parallel if more than one job is requested
+
+        Arguments:
+            records: List of CompoundRecord instances to check.
+
+        Returns:
+            Tuple of the accepted records and a list of (record, reason) tuples of the
+             rejected records.
+        """
+        check = partial(self.check_compound, mass_threshold=self.mass_threshold)
+        if self.jobs > 1 and len(records) > 1:
+            chunksize = max(1, len(records) // (self.jobs * 4))
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(executor.map(check, records, chunksize=chunksize))
+        else:
+            results = [check(record) for record in records]
+
+        accepted = []
+        rejected = []
+        for record, reason in results:
+            if reason is None:
+                accepted.append(record)
+            else:
+                rejected.append((record, reason))
+        return accepted, rejected
+
+    def write_rejection_report(self: Self, rejected: List[Tuple[CompoundRecord, str]]):
+        """Uses pandas to write a space delimited .csv style file of rejected compounds
+
+        Arguments:
+            rejected: List of (record, reason) tuples.
+        """
+        pd.DataFrame(
+            [
+                {
+                    "metabolite_name": record.name,
+                    "MIBiG_entry_ID": ",".join(record.mibig_ids),
+                    "SMILES": record.smiles,
+                    "reason": reason,
+                }
+                for record, reason in rejected
+            ],
+            columns=["metabolite_name", "MIBiG_entry_ID", "SMILES", "reason"],
+        ).to_csv(self.rejection_file, sep=" ", index=False)
@@ -22,34 +22,208 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from sys import argv
+import sys
 
 from fermo_core_extras.mibig_spectral_library.data_processing.class_parsing_manager import (
     ParsingManager,
 )
-from fermo_core_extras.mibig_spectral_library.data_processing.class_script_manager import (
-    LibraryPrep,
-)
 
 
-def run_library_prep():
-    """Drives the MIBiG spectral library pipeline and enables logging"""
+def run_library_prep(data):
+    """Drives the MIBiG spectral library pipeline and enables logging
+
+    Arguments:
+        data: LibraryPrep instance holding the pipeline configuration.
+    """
     data.make_output_folder()
     logger = data.run_logger()
 
     logger.info("Extracting metabolites and metadata from the MIBiG folder")
-    data.process_mibig()
+    with data.profile_stage("preprocess"):
+        data.process_mibig(logger)
 
     logger.info("Started CFM-ID ms/ms spectra prediction for MIBiG entries")
-    data.run_cfmid(logger)
+    with data.profile_stage("predict"):
+        data.run_cfmid(logger)
     logger.info("CFM-ID ms/ms spectra prediction completed")
 
     logger.info("Adding metadata to CFM-ID output and generating .mgf file")
-    data.run_metadata()
+    with data.profile_stage("postprocess"):
+        data.run_metadata()
+    if data.previous_library is not None:
+        with data.profile_stage("diff"):
+            data.run_diff(logger)
     logger.info("All actions completed successfully")
 
 
+def run_preprocess(data):
+    """Runs the extraction of metabolites and metadata from the MIBiG folder
+
+    Arguments:
+        data: LibraryPrep instance holding the pipeline configuration.
+    """
+    data.make_output_folder()
+    logger = data.run_logger("spectral_library_creator_preprocess.log")
+    logger.info("Extracting metabolites and metadata from the MIBiG folder")
+    with data.profile_stage("preprocess"):
+        data.process_mibig(logger)
+    logger.info("Preprocessing completed")
+
+
+def run_predict(data):
+    """Runs the CFM-ID ms/ms spectra prediction on the preprocessed input
+
+    Arguments:
+        data: LibraryPrep instance holding the pipeline configuration.
+    """
+    data.make_output_folder()
+    logger = data.run_logger("spectral_library_creator_predict.log")
+    logger.info("Started CFM-ID ms/ms spectra prediction for MIBiG entries")
+    with data.profile_stage("predict"):
+        data.run_cfmid(logger)
+    logger.info("CFM-ID ms/ms spectra prediction completed")
+
+
+def run_worker(data, chunk, n_chunks):
+    """Runs the CFM-ID ms/ms spectra prediction on one chunk of the input
+
+    Arguments:
+        data: LibraryPrep instance holding the pipeline configuration.
+        chunk: Zero-based index of the chunk to process.
+        n_chunks: Total number of chunks.
+    """
+    data.make_output_folder()
+    logger = data.run_logger(f"spectral_library_creator_worker_{chunk}.log")
+    logger.info(f"Started CFM-ID ms/ms spectra prediction for chunk {chunk}")
+    with data.profile_stage(f"worker_{chunk}"):
+        data.run_cfmid_chunk(logger, chunk, n_chunks)
+    logger.info(f"CFM-ID ms/ms spectra prediction completed for chunk {chunk}")
+
+
+def run_postprocess(data):
+    """Adds metadata to the CFM-ID output and generates the .mgf file
+
+    Arguments:
+        data: LibraryPrep instance holding the pipeline configuration.
+    """
+    data.make_output_folder()
+    logger = data.run_logger("spectral_library_creator_postprocess.log")
+    logger.info("Adding metadata to CFM-ID output and generating .mgf file")
+    with data.profile_stage("postprocess"):
+        data.run_metadata()
+    if data.previous_library is not None:
+        with data.profile_stage("diff"):
+            data.run_diff(logger)
+    logger.info("Postprocessing completed")
+
+
+def run_query(arguments_dictionary):
+    """Prints the spectra matching the query to stdout
+
+    Arguments:
+        arguments_dictionary: Parsed command line arguments of the query subcommand.
+
+    Returns:
+        0 if at least one spectrum was found, 1 otherwise.
+    """
+    from fermo_core_extras.mibig_spectral_library.data_processing.class_query_manager import (
+        QueryManager,
+    )
+
+    matches = QueryManager.run_query(
+        mgf_file=arguments_dictionary["mgf_file"],
+        metabolite_id=arguments_dictionary["id"],
+        mibig_id=arguments_dictionary["mibig_id"],
+        pepmass=arguments_dictionary["pepmass"],
+        tolerance=arguments_dictionary["tolerance"],
+    )
+    for block in matches:
+        sys.stdout.write("\n".join(block) + "\n\n")
+    return 0 if matches else 1
+
+
+def run_diff(arguments_dictionary):
+    """Writes the delta between two libraries and prints a summary to stdout
+
+    Arguments:
+        arguments_dictionary: Parsed command line arguments of the diff subcommand.
+
+    Returns:
+        0 on success.
+    """
+    from fermo_core_extras.mibig_spectral_library.data_processing.class_diff_manager import (
+        DiffManager,
+    )
+
+    counts = DiffManager.diff_libraries(**arguments_dictionary)
+    sys.stdout.write(
+        " ".join(f"{name}={count}" for name, count in counts.items()) + "\n"
+    )
+    return 0
+
+
+def run_patch(arguments_dictionary):
+    """Applies a delta to a library and prints a summary to stdout
+
+    Arguments:
+        arguments_dictionary: Parsed command line arguments of the patch subcommand.
+
+    Returns:
+        0 on success.
+    """
+    from fermo_core_extras.mibig_spectral_library.data_processing.class_diff_manager import (
+        DiffManager,
+    )
+
+    if arguments_dictionary["sort_by"] == "none":
+        arguments_dictionary["sort_by"] = None
+    counts = DiffManager.patch_library(**arguments_dictionary)
+    sys.stdout.write(
+        " ".join(f"{name}={count}" for name, count in counts.items()) + "\n"
+    )
+    return 0
+
+
+def main(commandline_args=None):
+    """Console entry point dispatching to the pipeline subcommands
+
+    Heavy dependencies are only imported once a subcommand needs them, to keep
+    startup fast for --help, query, diff and patch invocations.
+
+    Arguments:
+        commandline_args: Raw command line input; defaults to sys.argv[1:].
+
+    Returns:
+        Exit code of the subcommand.
+    """
+    if commandline_args is None:
+        commandline_args = sys.argv[1:]
+    arguments_dictionary = ParsingManager.run_parser(commandline_args)
+    command = arguments_dictionary.pop("command")
+
+    light_commands = {"query": run_query, "diff": run_diff, "patch": run_patch}
+    if command in light_commands:
+        return light_commands[command](arguments_dictionary)
+
+    from fermo_core_extras.mibig_spectral_library.data_processing.class_script_manager import (
+        LibraryPrep,
+    )
+
+    if command == "worker":
+        chunk = arguments_dictionary.pop("chunk")
+        n_chunks = arguments_dictionary.pop("n_chunks")
+        run_worker(LibraryPrep(**arguments_dictionary), chunk, n_chunks)
+        return 0
+
+    commands = {
+        "run": run_library_prep,
+        "preprocess": run_preprocess,
+        "predict": run_predict,
+        "postprocess": run_postprocess,
+    }
+    commands[command](LibraryPrep(**arguments_dictionary))
+    return 0
+
+
 if __name__ == "__main__":
-    arguments_dictionary = ParsingManager.run_parser(argv[1:])
-    data = LibraryPrep(**arguments_dictionary)
-    run_library_prep()
+    sys.exit(main())
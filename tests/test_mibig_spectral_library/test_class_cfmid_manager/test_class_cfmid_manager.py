@@ -0,0 +1,76 @@
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_cfmid_manager import (
+    CfmidManager,
+)
+
+
+def test_cfmid_manager_write_chunk_valid(tmp_path):
+    infile = tmp_path.joinpath("cfm_id_input.txt")
+    infile.write_text("a C\nb CC\nc CCC\nd CCCC\ne CCCCC\n")
+    chunk_file = CfmidManager.write_chunk(
+        infile, tmp_path.joinpath("chunk_1.txt"), chunk=1, n_chunks=2
+    )
+    assert chunk_file.read_text() == "b CC\nd CCCC\n"
+
+
+def test_cfmid_manager_write_chunk_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        CfmidManager.write_chunk(
+            tmp_path.joinpath("cfm_id_input.txt"),
+            tmp_path.joinpath("chunk_2.txt"),
+            chunk=2,
+            n_chunks=2,
+        )
+
+
+@pytest.fixture
+def initialize_class(tmp_path):
+    infile = tmp_path.joinpath("cfm_id_input.txt")
+    infile.write_text("a C\nb CC\nc CCC\n")
+    manager = CfmidManager(
+        prepped_cfmid_file=infile,
+        cfm_id_folder=tmp_path.joinpath("cfm_id_predicted_spectra"),
+        prune_probability=0.001,
+        niceness=16,
+    )
+    manager.cfm_id_folder.mkdir()
+    return manager
+
+
+def test_cfmid_manager_predicted_smiles_valid(tmp_path):
+    log_file = tmp_path.joinpath("a.log")
+    log_file.write_text("#ID=a\n#SMILES=CCO\n#Formula=C2H6O\nenergy0\n")
+    assert CfmidManager.predicted_smiles(log_file) == "CCO"
+
+
+def test_cfmid_manager_predicted_smiles_invalid(tmp_path):
+    log_file = tmp_path.joinpath("a.log")
+    log_file.write_text("#ID=a\nenergy0\n#SMILES=CCO\n")
+    assert CfmidManager.predicted_smiles(log_file) is None
+
+
+def test_cfmid_manager_write_pending_valid(initialize_class, tmp_path):
+    previous = tmp_path.joinpath("previous")
+    previous.mkdir()
+    previous.joinpath("a.log").write_text("#SMILES=C\nprediction")
+    initialize_class.cfm_id_folder.joinpath("b.log").write_text("#SMILES=CC\n")
+    pending = tmp_path.joinpath("pending.txt")
+    assert initialize_class.write_pending(pending, previous) == (2, 1)
+    assert pending.read_text() == "c CCC\n"
+    assert (
+        initialize_class.cfm_id_folder.joinpath("a.log").read_text()
+        == "#SMILES=C\nprediction"
+    )
+
+
+def test_cfmid_manager_write_pending_invalid(initialize_class, tmp_path):
+    previous = tmp_path.joinpath("previous")
+    previous.mkdir()
+    previous.joinpath("a.log").write_text("#SMILES=N\nprediction")
+    initialize_class.cfm_id_folder.joinpath("b.log").write_text("#SMILES=CO\n")
+    pending = tmp_path.joinpath("pending.txt")
+    assert initialize_class.write_pending(pending, previous) == (0, 3)
+    assert pending.read_text() == "a C\nb CC\nc CCC\n"
+    assert not initialize_class.cfm_id_folder.joinpath("a.log").exists()
+    assert not initialize_class.cfm_id_folder.joinpath("b.log").exists()
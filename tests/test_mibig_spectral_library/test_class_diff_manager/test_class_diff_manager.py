@@ -0,0 +1,106 @@
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_diff_manager import (
+    DiffManager,
+)
+
+
+def write_library(path, spectra):
+    path.write_text(
+        "".join(
+            f"BEGIN IONS\nID={key}\nPEPMASS={pepmass}\n100.00000 100.00\nEND IONS\n\n"
+            for key, pepmass in spectra
+        )
+    )
+    return path
+
+
+@pytest.fixture
+def libraries(tmp_path):
+    old = write_library(tmp_path.joinpath("old.mgf"), [("a", 1), ("b", 2), ("c", 3)])
+    new = write_library(tmp_path.joinpath("new.mgf"), [("a", 1), ("c", 4), ("d", 5)])
+    return old, new
+
+
+def test_diff_manager_diff_libraries_valid(libraries, tmp_path):
+    old, new = libraries
+    counts = DiffManager.diff_libraries(old, new, tmp_path.joinpath("delta"))
+    assert counts == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1}
+    assert "ID=d" in tmp_path.joinpath("delta", "added.mgf").read_text()
+    assert "ID=b" in tmp_path.joinpath("delta", "removed.mgf").read_text()
+    assert "PEPMASS=4" in tmp_path.joinpath("delta", "changed.mgf").read_text()
+
+
+def test_diff_manager_patch_library_valid(libraries, tmp_path):
+    old, new = libraries
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(old, new, delta)
+    patched = tmp_path.joinpath("patched.mgf")
+    counts = DiffManager.patch_library(old, delta, patched)
+    assert counts == {"added": 1, "removed": 1, "changed": 1}
+    assert patched.read_text() == new.read_text()
+
+
+def test_diff_manager_patch_library_invalid(libraries, tmp_path):
+    old, new = libraries
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(old, new, delta)
+    other = write_library(tmp_path.joinpath("other.mgf"), [("a", 1)])
+    with pytest.raises(ValueError):
+        DiffManager.patch_library(other, delta, tmp_path.joinpath("patched.mgf"))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "delta",
+        "new.mgf",
+        "old.mgf",
+        "other.mgf",
+    ]
+
+
+def test_diff_manager_patch_library_in_place_valid(libraries, tmp_path):
+    old, new = libraries
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(old, new, delta)
+    DiffManager.patch_library(old, delta, old)
+    assert old.read_text() == new.read_text()
+
+
+def test_diff_manager_patch_library_in_place_invalid(libraries, tmp_path):
+    old, new = libraries
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(old, new, delta)
+    DiffManager.patch_library(old, delta, old)
+    with pytest.raises(ValueError, match="already in library"):
+        DiffManager.patch_library(old, delta, old)
+    assert old.read_text() == new.read_text()
+
+
+def test_diff_manager_duplicate_id_invalid(tmp_path):
+    library = write_library(tmp_path.joinpath("dup.mgf"), [("a", 1), ("a", 2)])
+    with pytest.raises(ValueError):
+        DiffManager.diff_libraries(library, library, tmp_path.joinpath("delta"))
+
+
+def test_diff_manager_patch_library_sorted_valid(libraries, tmp_path):
+    old, new = libraries
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(new, old, delta)
+    patched = tmp_path.joinpath("patched.mgf")
+    DiffManager.patch_library(new, delta, patched)
+    assert patched.read_text() == old.read_text()
+
+
+def test_diff_manager_patch_library_keep_order_valid(tmp_path):
+    old = write_library(tmp_path.joinpath("old.mgf"), [("c", 3), ("a", 1)])
+    new = write_library(tmp_path.joinpath("new.mgf"), [("a", 1), ("b", 2), ("c", 3)])
+    delta = tmp_path.joinpath("delta")
+    DiffManager.diff_libraries(old, new, delta)
+    patched = tmp_path.joinpath("patched.mgf")
+    DiffManager.patch_library(old, delta, patched, sort_by=None)
+    assert (
+        patched.read_text()
+        == write_library(
+            tmp_path.joinpath("expected.mgf"), [("c", 3), ("a", 1), ("b", 2)]
+        ).read_text()
+    )
+    DiffManager.patch_library(old, delta, patched)
+    assert patched.read_text() == new.read_text()
@@ -0,0 +1,22 @@
+from fermo_core_extras.mibig_spectral_library.data_processing.class_logger import Logger
+
+
+def test_logger_log_file_name_valid(tmp_path):
+    for name in ("preprocess", "postprocess"):
+        logger = Logger(
+            logging_level="INFO",
+            output_folder=str(tmp_path),
+            log_file_name=f"spectral_library_creator_{name}.log",
+        ).enable_logging()
+        logger.info(f"{name} message")
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+    assert (
+        "preprocess message"
+        in tmp_path.joinpath("spectral_library_creator_preprocess.log").read_text()
+    )
+    assert (
+        "postprocess message"
+        in tmp_path.joinpath("spectral_library_creator_postprocess.log").read_text()
+    )
@@ -0,0 +1,62 @@
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_parsing_manager import (
+    ParsingManager,
+)
+
+
+def test_parsing_manager_run_valid():
+    args_dict = ParsingManager.run_parser(
+        ["run", "-i", "mibig", "-o", "out", "-p", "0.01", "-n", "10"]
+    )
+    assert args_dict["command"] == "run"
+    assert args_dict["prune"] == 0.01
+    assert args_dict["niceness"] == 10
+    assert args_dict["mass_threshold"] == 2000
+
+
+def test_parsing_manager_worker_valid():
+    args_dict = ParsingManager.run_parser(
+        ["worker", "-o", "out", "--chunk", "1", "--n_chunks", "4"]
+    )
+    assert args_dict["chunk"] == 1
+    assert args_dict["n_chunks"] == 4
+    assert "input" not in args_dict
+
+
+def test_parsing_manager_patch_valid():
+    args_dict = ParsingManager.run_parser(
+        ["patch", "-f", "lib.mgf", "-d", "delta", "-o", "patched.mgf"]
+    )
+    assert args_dict["sort_by"] == "pepmass"
+    args_dict = ParsingManager.run_parser(
+        ["patch", "-f", "lib.mgf", "-d", "delta", "-o", "lib.mgf", "--sort_by", "none"]
+    )
+    assert args_dict["sort_by"] == "none"
+
+
+def test_parsing_manager_no_command_invalid():
+    with pytest.raises(SystemExit):
+        ParsingManager.run_parser([])
+
+
+def test_parsing_manager_filters_valid():
+    args_dict = ParsingManager.run_parser(
+        [
+            "preprocess",
+            "-i",
+            "mibig",
+            "-o",
+            "out",
+            "--include_accessions",
+            "BGC0000001-BGC0000100",
+            "BGC0000200",
+            "--max_heavy_atoms",
+            "60",
+        ]
+    )
+    assert args_dict["filters"] == {
+        "include_accessions": ["BGC0000001-BGC0000100", "BGC0000200"],
+        "max_heavy_atoms": 60,
+    }
+    assert "max_heavy_atoms" not in args_dict
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import pytest
 
 from fermo_core_extras.mibig_spectral_library.data_processing.class_postprocessing_manager import (
@@ -23,11 +25,55 @@ def return_file_list():
     return file_list
 
 
-def test_postprocessing_manager_format_log_dict_valid(initialize_class):
+def test_postprocessing_manager_add_metadata_cfmid_files_valid(initialize_class):
+    test_case = initialize_class
+    test_case.extract_metadata()
+    test_case.add_metadata_cfmid_files(return_file_list())
+    blocks = [block for _, block in test_case.sorter.buffer]
+    assert len(blocks) == 2
+    assert "ID=(+)-O-methylkolavelool\n" in blocks[0]
+    assert "MIBIGACCESSION=BGC0001198\n" in blocks[0]
+    assert "MIBIGACCESSION=BGC0000001\n" in blocks[1]
+
+
+def test_postprocessing_manager_add_metadata_cfmid_files_invalid(
+    initialize_class, tmp_path
+):
     test_case = initialize_class
+    metadata_file = tmp_path.joinpath("mibig_metadata.csv")
+    lines = Path(test_case.prepped_metadata_file).read_text().splitlines()
+    metadata_file.write_text("\n".join(lines[:2]) + "\n")
+    test_case.prepped_metadata_file = str(metadata_file)
     test_case.extract_metadata()
     test_case.add_metadata_cfmid_files(return_file_list())
-    test_case.format_log_dict()
-    assert len(test_case.log_dict) == 2
-    assert len(test_case.log_dict["(+)-O-methylkolavelool"]) == 291
-    assert len(test_case.log_dict["abyssomicin_C"]) == 75
+    blocks = [block for _, block in test_case.sorter.buffer]
+    assert len(blocks) == 1
+    assert "ID=abyssomicin_C\n" in blocks[0]
+
+
+def test_postprocessing_manager_write_mgf_to_file_valid(initialize_class, tmp_path):
+    test_case = initialize_class
+    test_case.mgf_file = str(tmp_path.joinpath("test.mgf"))
+    test_case.extract_metadata()
+    test_case.add_metadata_cfmid_files(return_file_list())
+    test_case.write_mgf_to_file()
+    lines = tmp_path.joinpath("test.mgf").read_text().splitlines()
+    assert lines.count("BEGIN IONS") == 2
+    assert "MIBIGACCESSION=BGC0000001" in lines
+    assert "PEPMASS=347.14891" in lines
+
+
+@pytest.mark.parametrize("max_spectra_in_memory", [1, 10000])
+def test_postprocessing_manager_write_mgf_to_file_sorted(
+    initialize_class, tmp_path, max_spectra_in_memory
+):
+    test_case = initialize_class
+    test_case.mgf_file = str(tmp_path.joinpath("test.mgf"))
+    test_case.max_spectra_in_memory = max_spectra_in_memory
+    test_case.extract_metadata()
+    test_case.add_metadata_cfmid_files(return_file_list()[::-1])
+    test_case.write_mgf_to_file()
+    lines = tmp_path.joinpath("test.mgf").read_text().splitlines()
+    pepmasses = [line for line in lines if line.startswith("PEPMASS=")]
+    assert pepmasses == ["PEPMASS=305.28389", "PEPMASS=347.14891"]
+    assert [path.name for path in tmp_path.iterdir()] == ["test.mgf"]
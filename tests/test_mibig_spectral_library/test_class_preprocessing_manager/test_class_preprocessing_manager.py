@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_preprocessing_manager import (
+    PreprocessingManager,
+)
+
+
+@pytest.fixture
+def initialize_class(tmp_path):
+    args_dict = {
+        "prepped_cfmid_file": str(tmp_path.joinpath("cfm_id_input.txt")),
+        "prepped_metadata_file": str(tmp_path.joinpath("mibig_metadata.csv")),
+    }
+    return PreprocessingManager(**args_dict)
+
+
+def write_json(tmp_path, accession, compounds):
+    file_path = tmp_path.joinpath(f"{accession}.json")
+    file_path.write_text(
+        json.dumps({"cluster": {"mibig_accession": accession, "compounds": compounds}})
+    )
+    return str(file_path)
+
+
+def test_preprocessing_manager_extract_metadata_valid(initialize_class, tmp_path):
+    file_path = write_json(
+        tmp_path,
+        "BGC0000001",
+        [
+            {"compound": "no structure"},
+            {"compound": "bad mass", "chem_struct": "CCO", "mol_mass": "n/a"},
+            {"compound": "good mass", "chem_struct": "CC", "mol_mass": "30.05"},
+        ],
+    )
+    initialize_class.extract_metadata(file_path)
+    assert list(initialize_class.bgc_dict) == ["bad_mass", "good_mass"]
+    assert initialize_class.bgc_dict["bad_mass"].mol_mass is None
+    assert initialize_class.bgc_dict["good_mass"].mol_mass == 30.05
+    assert initialize_class.rejected[0][1] == "missing SMILES"
+
+
+def test_preprocessing_manager_extract_metadata_merge_valid(initialize_class, tmp_path):
+    compounds = [{"compound": "abyssomicin C", "chem_struct": "CCO"}]
+    initialize_class.extract_metadata(write_json(tmp_path, "BGC0000001", compounds))
+    initialize_class.extract_metadata(write_json(tmp_path, "BGC0000002", compounds))
+    assert initialize_class.bgc_dict["abyssomicin_C"].mibig_ids == [
+        "BGC0000002",
+        "BGC0000001",
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters,selected",
+    [
+        ({}, True),
+        ({"include_accessions": ["BGC0000001-BGC0000010"]}, True),
+        ({"include_accessions": ["BGC0000006"]}, False),
+        ({"exclude_accessions": ["BGC0000005"]}, False),
+        ({"biosyn_class": "polyketide"}, True),
+        ({"biosyn_class": "Terpene"}, False),
+        ({"organism": "streptomyces"}, True),
+        ({"organism": "Bacillus"}, False),
+    ],
+)
+def test_preprocessing_manager_bgc_selected(initialize_class, filters, selected):
+    cluster = {
+        "mibig_accession": "BGC0000005",
+        "biosyn_class": ["NRP", "Polyketide"],
+        "organism_name": "Streptomyces coelicolor A3(2)",
+    }
+    for key, value in filters.items():
+        setattr(initialize_class, key, value)
+    assert initialize_class.bgc_selected(cluster) is selected
+
+
+def test_preprocessing_manager_filter_records_valid(initialize_class, tmp_path):
+    compounds = [
+        {"compound": "ethanol", "chem_struct": "CCO", "mol_mass": 46.04},
+        {"compound": "decane", "chem_struct": "CCCCCCCCCC", "mol_mass": 142.17},
+        {"compound": "no mass", "chem_struct": "CCCO"},
+        {
+            "compound": "sodium acetate",
+            "chem_struct": "[Na+].CC([O-])=O",
+            "mol_mass": 82,
+        },
+    ]
+    initialize_class.extract_metadata(write_json(tmp_path, "BGC0000001", compounds))
+    initialize_class.min_mass = 40
+    initialize_class.max_heavy_atoms = 5
+    assert initialize_class.filter_records() == 2
+    assert list(initialize_class.bgc_dict) == ["ethanol", "sodium_acetate"]
+    initialize_class.min_heavy_atoms = 4
+    assert initialize_class.filter_records() == 1
+    assert list(initialize_class.bgc_dict) == ["sodium_acetate"]
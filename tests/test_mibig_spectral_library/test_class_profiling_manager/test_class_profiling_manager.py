@@ -0,0 +1,42 @@
+import pstats
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_profiling_manager import (
+    ProfilingManager,
+)
+
+
+def process(item):
+    return sorted(str(item) * 10)
+
+
+def test_profiling_manager_stage_valid(tmp_path):
+    profiler = ProfilingManager(output_folder=str(tmp_path), top_n=5)
+    with profiler.stage("postprocess"):
+        for item in profiler.iterate(list(range(10))):
+            process(item)
+    assert tmp_path.joinpath("profile_postprocess.prof").exists()
+    summary = tmp_path.joinpath("profile_postprocess.txt").read_text()
+    assert summary.startswith("=== postprocess")
+    assert "process" in summary
+
+
+def test_profiling_manager_iterate_sample_valid(tmp_path):
+    profiler = ProfilingManager(output_folder=str(tmp_path), sample_size=3)
+    with profiler.stage("preprocess"):
+        for item in profiler.iterate(list(range(10))):
+            process(item)
+    stats = pstats.Stats(str(tmp_path.joinpath("profile_preprocess.prof")))
+    calls = [value[1] for key, value in stats.stats.items() if key[2] == "process"]
+    assert calls == [3]
+
+
+def test_profiling_manager_iterate_sample_stage_work_valid(tmp_path):
+    profiler = ProfilingManager(output_folder=str(tmp_path), sample_size=3)
+    with profiler.stage("worker_1"):
+        for item in profiler.iterate(list(range(10))):
+            process(item)
+        sorted(range(100))
+    stats = pstats.Stats(str(tmp_path.joinpath("profile_worker_1.prof")))
+    assert any(key[2] == "<built-in method builtins.sorted>" for key in stats.stats)
+    summary = tmp_path.joinpath("profile_worker_1.txt").read_text()
+    assert "excluding 7 of 10 unsampled items" in summary
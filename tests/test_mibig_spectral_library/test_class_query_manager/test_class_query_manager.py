@@ -0,0 +1,24 @@
+from fermo_core_extras.mibig_spectral_library.data_processing.class_query_manager import (
+    QueryManager,
+)
+
+MGF_FILE = (
+    "fermo_core_extras/mibig_spectral_library/data/mibig_spectral_library_3_1.mgf"
+)
+
+
+def test_query_manager_id_valid():
+    matches = QueryManager.run_query(MGF_FILE, metabolite_id="APE_Vf")
+    assert len(matches) == 1
+    assert matches[0][0] == "BEGIN IONS"
+    assert matches[0][-1] == "END IONS"
+    assert "PEPMASS=337.17982" in matches[0]
+
+
+def test_query_manager_pepmass_valid():
+    matches = QueryManager.run_query(MGF_FILE, pepmass=337.18, tolerance=0.001)
+    assert any("ID=APE_Vf" in block for block in matches)
+
+
+def test_query_manager_id_invalid():
+    assert QueryManager.run_query(MGF_FILE, metabolite_id="not_a_metabolite") == []
@@ -0,0 +1,43 @@
+import numpy as np
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_records import (
+    CompoundRecord,
+    SpectrumRecord,
+)
+
+LOG_FILE = "tests/test_mibig_spectral_library/test_class_postprocessing_manager/test_spectra/abyssomicin_C.log"
+
+
+def test_spectrum_record_from_cfmid_log_valid():
+    spectrum = SpectrumRecord.from_cfmid_log(LOG_FILE)
+    assert spectrum.name == "abyssomicin_C"
+    assert spectrum.insilico == "ESI-MS/MS[M+H]+Spectra"
+    assert spectrum.predicted_by == "CFM-ID4.4.7"
+    assert spectrum.pepmass == 347.14891
+    assert spectrum.mz.dtype == np.float64
+    assert spectrum.intensity.dtype == np.float32
+    assert len(np.unique(spectrum.mz)) == len(spectrum.mz)
+    assert np.all(np.diff(spectrum.intensity) <= 0)
+
+
+def test_spectrum_record_to_mgf_valid():
+    spectrum = SpectrumRecord.from_cfmid_log(LOG_FILE)
+    spectrum.mibig_accession = "BGC0000001"
+    lines = spectrum.to_mgf().strip().splitlines()
+    assert lines[0] == "BEGIN IONS"
+    assert lines[3] == "ID=abyssomicin_C"
+    assert lines[8] == "MIBIGACCESSION=BGC0000001"
+    assert lines[-1] == "END IONS"
+
+
+def test_compound_record_row_roundtrip_valid():
+    record = CompoundRecord(
+        name="abyssomicin_C",
+        smiles="CC",
+        mol_mass=346.14,
+        mibig_ids=["BGC0000001", "BGC0000002"],
+    )
+    row = {key: str(value) for key, value in record.to_row().items()}
+    row["chemical_formula"] = ""
+    row["database_IDs"] = ""
+    assert CompoundRecord.from_row(row) == record
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_sort_manager import (
+    SortManager,
+)
+
+
+def make_block(key, pepmass):
+    return f"BEGIN IONS\nID={key}\nPEPMASS={pepmass}\n100.00000 100.00\nEND IONS\n\n"
+
+
+@pytest.mark.parametrize(
+    "sort_by,max_in_memory,fan_in",
+    [("pepmass", 1000, 64), ("pepmass", 3, 2), ("id", 4, 3)],
+)
+def test_sort_manager_write_valid(tmp_path, sort_by, max_in_memory, fan_in):
+    spectra = [
+        (f"spectrum_{i:03d}", f"{random.uniform(100, 2000):.5f}") for i in range(50)
+    ]
+    spectra.append(("spectrum_tie", spectra[0][1]))
+    random.shuffle(spectra)
+    sorter = SortManager(
+        sort_by=sort_by,
+        max_in_memory=max_in_memory,
+        fan_in=fan_in,
+        temp_folder=str(tmp_path),
+    )
+    for key, pepmass in spectra:
+        sorter.add({"ID": key, "PEPMASS": pepmass}, make_block(key, pepmass))
+    output_file = tmp_path.joinpath("sorted.mgf")
+    sorter.write(output_file)
+
+    if sort_by == "pepmass":
+        expected = sorted(
+            spectra, key=lambda spectrum: (float(spectrum[1]), spectrum[0])
+        )
+    else:
+        expected = sorted(spectra)
+    assert output_file.read_text() == "".join(
+        make_block(key, pepmass) for key, pepmass in expected
+    )
+    assert [path.name for path in tmp_path.iterdir()] == ["sorted.mgf"]
+
+
+def test_sort_manager_sort_key_valid(tmp_path):
+    spectra = [("c", "nan"), ("a", "300.00000"), ("b", "nan"), ("d", "100.00000")]
+    outputs = set()
+    for attempt in range(5):
+        random.shuffle(spectra)
+        sorter = SortManager(
+            sort_by="pepmass", max_in_memory=2, fan_in=2, temp_folder=str(tmp_path)
+        )
+        for key, pepmass in spectra:
+            sorter.add({"ID": key, "PEPMASS": pepmass}, make_block(key, pepmass))
+        output_file = tmp_path.joinpath(f"sorted_{attempt}.mgf")
+        sorter.write(output_file)
+        outputs.add(output_file.read_text())
+    assert outputs == {
+        "".join(
+            make_block(key, pepmass)
+            for key, pepmass in [
+                ("d", "100.00000"),
+                ("a", "300.00000"),
+                ("b", "nan"),
+                ("c", "nan"),
+            ]
+        )
+    }
+
+
+def test_sort_manager_sort_key_invalid():
+    with pytest.raises(ValueError):
+        SortManager(sort_by="mass")
@@ -0,0 +1,141 @@
+from pathlib import Path
+
+import pytest
+
+from fermo_core_extras.mibig_spectral_library.data_processing.class_query_manager import (
+    QueryManager,
+)
+from fermo_core_extras.mibig_spectral_library.data_processing.class_records import (
+    CompoundRecord,
+)
+from fermo_core_extras.mibig_spectral_library.data_processing.class_validation_manager import (
+    ValidationManager,
+)
+
+
+@pytest.fixture
+def initialize_class(tmp_path):
+    args_dict = {
+        "mass_threshold": 2000,
+        "rejection_file": str(tmp_path.joinpath("rejected.csv")),
+        "jobs": 2,
+    }
+    return ValidationManager(**args_dict)
+
+
+def test_validation_manager_mass_from_formula_valid():
+    assert ValidationManager.mass_from_formula("C19H22O6") == pytest.approx(
+        346.141638424
+    )
+
+
+def test_validation_manager_mass_from_formula_invalid():
+    assert ValidationManager.mass_from_formula("C19H22O6Hg") is None
+    assert ValidationManager.mass_from_formula("n/a") is None
+
+
+@pytest.mark.parametrize(
+    "smiles,formula",
+    [
+        (
+            "CC1C[C@]23OC(=O)C4=C2OC1C(O)C3\\C=C/C(=O)[C@@H](C)C[C@@H](C)C4=O",
+            {"C": 19, "H": 22, "O": 6},
+        ),
+        ("c1ccc2[nH]ccc2c1", {"C": 8, "H": 7, "N": 1}),
+        ("c1ccsc1", {"C": 4, "H": 4, "S": 1}),
+        ("CS(=O)(=O)C", {"C": 2, "H": 6, "O": 2, "S": 1}),
+        ("C[As](=O)(O)C", {"C": 2, "H": 7, "As": 1, "O": 2}),
+        ("CC[*]", {"C": 2, "H": 5, "*": 1}),
+    ],
+)
+def test_validation_manager_count_smiles_atoms_valid(smiles, formula):
+    assert ValidationManager.count_smiles_atoms(smiles) == formula
+
+
+@pytest.mark.parametrize("smiles", ["C(C", "CC)", "C1CC", "C.C", "CX"])
+def test_validation_manager_count_smiles_atoms_invalid(smiles):
+    with pytest.raises(ValueError):
+        ValidationManager.count_smiles_atoms(smiles)
+
+
+def test_validation_manager_validate_records_valid(initialize_class):
+    records = [
+        CompoundRecord(name="ethanol", smiles="CCO"),
+        CompoundRecord(name="acetic_acid", smiles="CC(=O)O", formula="C2H4O2"),
+        CompoundRecord(name="iron", smiles="[Fe+2]"),
+        CompoundRecord(name="malformed", smiles="CC(O"),
+        CompoundRecord(name="heavy", smiles="CCCC", mol_mass=5000.0),
+    ]
+    accepted, rejected = initialize_class.validate_records(records)
+    assert [record.name for record in accepted] == ["ethanol", "acetic_acid", "iron"]
+    assert accepted[0].mol_mass == pytest.approx(46.041865)
+    assert [record.name for record, _ in rejected] == ["malformed", "heavy"]
+
+
+def test_validation_manager_check_compound_multi_component_valid():
+    record = CompoundRecord(
+        name="benzylpenicillin",
+        smiles="[Na+].[H][C@]12SC(C)(C)[C@@H](N1C(=O)[C@H]2NC(=O)Cc1ccccc1)C([O-])=O",
+        formula="C16H17N2NaO4S",
+    )
+    record, reason = ValidationManager.check_compound(record, 2000)
+    assert reason is None
+    assert record.smiles.startswith("[Na+].")
+    assert record.mol_mass == pytest.approx(356.0807, abs=1e-3)
+
+
+@pytest.mark.parametrize(
+    "smiles,mol_mass",
+    [
+        ("C[As](=O)(O)CCC(N)C(=O)O", pytest.approx(224.9982, abs=1e-3)),
+        ("CCN1O[Fe]2(ON1C)ON(C)C(C)O2", pytest.approx(249.0412, abs=1e-3)),
+        ("CCCC[*]", None),
+    ],
+)
+def test_validation_manager_check_compound_elements_valid(smiles, mol_mass):
+    record, reason = ValidationManager.check_compound(
+        CompoundRecord(name="x", smiles=smiles), 2000
+    )
+    assert reason is None
+    assert record.mol_mass == mol_mass
+
+
+def test_validation_manager_check_compound_library_valid():
+    library = (
+        Path(__file__)
+        .parents[3]
+        .joinpath(
+            "fermo_core_extras/mibig_spectral_library/data/mibig_spectral_library_3_1.mgf"
+        )
+    )
+    rejected = []
+    for header, _ in QueryManager.iterate_spectra(library):
+        record = CompoundRecord(
+            name=header["ID"],
+            smiles=header["SMILES"],
+            formula=header.get("FORMULA", ""),
+        )
+        _, reason = ValidationManager.check_compound(record, 2000)
+        if reason is not None and not reason.startswith("molecular mass"):
+            rejected.append((record.name, reason))
+    assert rejected == []
+
+
+@pytest.mark.parametrize("smiles", ["C..C", "CC.", "C.C(", "[Na+].[Fe"])
+def test_validation_manager_check_compound_multi_component_invalid(smiles):
+    _, reason = ValidationManager.check_compound(
+        CompoundRecord(name="x", smiles=smiles), 2000
+    )
+    assert reason is not None
+
+
+def test_validation_manager_write_rejection_report_valid(initialize_class):
+    record = CompoundRecord(name="broken", smiles="CC(O", mibig_ids=["BGC0000001"])
+    initialize_class.write_rejection_report(
+        [(record, "malformed SMILES: unbalanced parentheses")]
+    )
+    with open(initialize_class.rejection_file) as file:
+        lines = file.read().splitlines()
+    assert (
+        lines[1] == 'broken BGC0000001 CC(O "malformed SMILES: unbalanced parentheses"'
+    )